@@ -2,8 +2,8 @@
 
 It can compress images into astc textures and decompress astc textures into images.
 To yield the best performance, it checks the host CPU and imports the appropriate encoder implementation.
-Currently this is only supported on x86_64, all others use an encoder with no SIMD optimizations.
-The exception is aarch64, which uses the neon encoder by default.
+Currently this is supported on x86_64 (sse2, sse4.1, avx2) and aarch64 (neon, sve128, sve256),
+all others use an encoder with no SIMD optimizations.
 """
 
 __version__ = "0.1.12"
@@ -17,10 +17,15 @@ from .enum import (
 )
 
 from .encoder import (
+    ASTCCompressStats as ASTCCompressStats,
     ASTCConfig as ASTCConfig,
     ASTCContext as ASTCContext,
     ASTCImage as ASTCImage,
     ASTCSwizzle as ASTCSwizzle,
     ASTCError as ASTCError,
+    clear_context_cache as clear_context_cache,
+    clear_decode_cache as clear_decode_cache,
+    compress_multi as compress_multi,
     compute_error_metrics as compute_error_metrics,
+    decompress as decompress,
 )
@@ -3,35 +3,83 @@
 It checks the host CPU and imports the appropriate encoder implementation.
 """
 
-from archspec.cpu import host
-
-local_host = host()
-
-try:
-    # pypi wheels won't have these for now
-    if local_host.family.name == "aarch64":
-        # archspec doesn't detect the relevant features for arm
-        # so we assume neon is available,
-        # as it's unlikely for a device using the lib to not have it
-        from ._encoder_neon import *  # type: ignore
-    elif local_host.family.name == "x86_64":
-        if "avx2" in local_host.features:
-            from ._encoder_avx2 import *  # type: ignore
-        elif "sse4_1" in local_host.features:
-            from ._encoder_sse41 import *  # type: ignore
-        elif "sse2" in local_host.features:
-            from ._encoder_sse2 import *  # type: ignore
-except ImportError:
-    pass
-
-if "ASTCConfig" not in locals():
-    from ._encoder_none import *
+import importlib
+
+from ._encoder_none import get_cpu_features
+
+local_features = set(get_cpu_features())
+
+# variants in order of preference with the cpu features they need,
+# if one can't be imported the next supported one is tried,
+# e.g. sve256 -> sve128 -> neon -> none on aarch64
+_VARIANTS = (
+    # pypi wheels won't have the sve variants for now
+    ("_encoder_sve256", {"sve256"}),
+    ("_encoder_sve128", {"sve128"}),
+    ("_encoder_neon", {"neon"}),
+    ("_encoder_avx2", {"avx2", "f16c", "popcnt"}),
+    ("_encoder_sse41", {"sse4_1", "popcnt"}),
+    ("_encoder_sse2", {"sse2"}),
+)
+
+for _name, _required in _VARIANTS:
+    if not _required <= local_features:
+        continue
+    try:
+        _variant = importlib.import_module(f".{_name}", __package__)
+    except ImportError:
+        continue
+    break
+else:
+    _variant = importlib.import_module("._encoder_none", __package__)
+
+# same as a star import of the variant
+globals().update(
+    {key: value for key, value in vars(_variant).items() if not key.startswith("_")}
+)
 
 __all__ = (
+    "ASTCCompressStats",
     "ASTCConfig",
     "ASTCContext",
     "ASTCImage",
     "ASTCSwizzle",
     "ASTCError",
+    "clear_context_cache",
+    "clear_decode_cache",
+    "compress_multi",
     "compute_error_metrics",
+    "decompress",
 )
+
+_context_cache: dict = {}
+
+
+def _rebuild_context(config: "ASTCConfig", threads: int) -> "ASTCContext":  # noqa: F405
+    """Rebuild an unpickled ASTCContext.
+
+    The context is created lazily, so it's only allocated once it's used.
+    Every process keeps the contexts it unpickled,
+    and unpickling an equal context again returns the existing one.
+    """
+    _, config_args, (_, config_state) = config.__reduce__()
+    key = (config_args, tuple(sorted(config_state.items())), threads)
+    context = _context_cache.get(key)
+    if context is None:
+        context = _context_cache[key] = ASTCContext(config, threads, lazy=True)  # noqa: F405
+    return context
+
+
+def clear_context_cache() -> int:
+    """Drop the cached contexts of unpickled ASTCContexts.
+
+    Contexts that are still referenced elsewhere stay alive.
+
+    Returns
+    -------
+    int
+        The number of dropped contexts.
+    """
+    count = len(_context_cache)
+    _context_cache.clear()
+    return count
@@ -1,6 +1,18 @@
 from __future__ import annotations
 
-from typing import Literal, Optional, Union
+from os import PathLike
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from .enum import (
     ASTCConfigFlags,
@@ -17,6 +29,9 @@ class ASTCImage:
     3D image are passed in as an array of 2D slices.
     Each slice has identical size and color format.
 
+    Images can be pickled, with pickle protocol 5 the data is passed as out-of-band buffer,
+    so it doesn't have to be copied into the pickle.
+
     Attributes
     ----------
     dim_x : int
@@ -41,8 +56,38 @@ class ASTCImage:
         dim_x: int,
         dim_y: int,
         dim_z: int = 1,
-        data: Optional[bytes] = None,
-    ) -> None: ...
+        data: Optional[Union[bytes, bytearray, memoryview]] = None,
+    ) -> None:
+        """
+        Create an image.
+
+        Other bytes-like objects than bytes are copied into a new bytes object.
+        """
+        ...
+    @classmethod
+    def load(cls, source: Union[str, PathLike, bytes, BinaryIO]) -> ASTCImage:
+        """
+        Load an image file via the image loaders bundled with astc-encoder.
+
+        Supports all formats of stb_image (PNG, JPEG, BMP, TGA, HDR, ...) and OpenEXR.
+        The image is decoded without holding the GIL,
+        the decoded pixels are then copied, or converted for 16 bit images, into the data of the image.
+        The result always has 4 components, the data type depends on the source:
+          - 8 bit images: U8
+          - 16 bit images: F16
+          - HDR and EXR images: F32
+
+        Parameters
+        ----------
+        source : Union[str, PathLike, bytes, BinaryIO]
+            The path of the image file, its content or a file-like object.
+
+        Returns
+        -------
+        ASTCImage
+            The loaded image.
+        """
+        ...
 
 class ASTCConfig:
     """
@@ -54,6 +99,8 @@ class ASTCConfig:
     Note for any settings which are associated with a specific color component, the value in the
     config applies to the component that exists after any compression data swizzle is applied.
 
+    Configs can be pickled, including all modified settings.
+
     Legal block sizes are:
     - 2d
         - 4x4
@@ -245,19 +292,353 @@ class ASTCSwizzle:
         """
         ...
 
+class ASTCCompressStats:
+    """
+    Statistics of a compression, filled in by ASTCContext.compress.
+
+    Attributes
+    ----------
+    rdo_replaced_blocks : int
+        The number of blocks replaced by the rate-distortion optimization pass.
+    rdo_size_before : int
+        The zlib compressed size of the data before the rate-distortion optimization pass,
+        -1 if the pass wasn't run.
+    rdo_size_after : int
+        The zlib compressed size of the data after the rate-distortion optimization pass,
+        -1 if the pass wasn't run.
+    block_count : int
+        The number of blocks.
+    constant_blocks : int
+        The number of constant color (void-extent) blocks.
+    error_blocks : int
+        The number of invalid blocks.
+    partition_counts : Tuple[int, int, int, int]
+        The number of blocks using 1, 2, 3 and 4 partitions.
+    plane_counts : Tuple[int, int]
+        The number of blocks using 1 and 2 weight planes.
+    block_modes : Dict[int, int]
+        The number of blocks per block mode (the lower 11 bits of the block).
+    endpoint_formats : Dict[int, int]
+        The number of partitions per color endpoint format.
+    thread_times : Tuple[float, ...]
+        The wall time of each compression thread, in seconds.
+
+    The block statistics exclude constant and error blocks
+    and are only collected if the stats are requested,
+    so the compression itself isn't slowed down by them.
+    """
+
+    rdo_replaced_blocks: int
+    rdo_size_before: int
+    rdo_size_after: int
+    block_count: int
+    constant_blocks: int
+    error_blocks: int
+    partition_counts: Tuple[int, int, int, int]
+    plane_counts: Tuple[int, int]
+    block_modes: Dict[int, int]
+    endpoint_formats: Dict[int, int]
+    thread_times: Tuple[float, ...]
+
+    def __init__(self) -> None: ...
+
 class ASTCContext:
+    """
+    The codec context, holds the precomputed tables and working buffers for a config.
+
+    The context creation is expensive, so it should be re-used.
+    A context created before forking worker processes (e.g. multiprocessing with fork)
+    shares its block size tables copy-on-write with all workers,
+    as astc-encoder doesn't write to them after the creation.
+    Only the working buffers of the threads a worker actually uses get copied.
+
+    Contexts can be pickled, e.g. for a ProcessPoolExecutor.
+    They are rebuilt lazily from their config on unpickling,
+    so the tables and working buffers are only allocated once the context is used.
+    The rebuilt contexts are cached per process,
+    so unpickling an equal context again returns the same context object.
+    clear_context_cache drops the cached contexts.
+    As a context can't compress multiple images at once,
+    it shouldn't be used by multiple threads of the receiving process at the same time.
+
+    Attributes
+    ----------
+    config : ASTCConfig
+        The configuration used by this context.
+    threads : int
+        The thread count used by this context.
+        0 at creation uses the number of cpus the process is allowed to run on.
+    memory_usage : int
+        The memory allocated by the context, in bytes.
+        Grows with the thread count, as every thread has its own working buffers.
+        0 for a lazy context that wasn't used yet.
+    """
+
     config: ASTCConfig
     threads: int
+    memory_usage: int
+
+    def __init__(self, config: ASTCConfig, threads: int = 1, lazy: bool = False) -> None:
+        """
+        Create a context.
+
+        Parameters
+        ----------
+        config : ASTCConfig
+            The configuration, a lazy context reads it on first use.
+        threads : int
+            The thread count, 0 uses the number of cpus the process is allowed to run on.
+        lazy : bool
+            Allocate the tables and working buffers on first use instead of now.
+            Invalid configs are only reported then.
+        """
+        ...
+    def compress(
+        self,
+        image: ASTCImage,
+        swizzle: ASTCSwizzle,
+        rdo_lambda: float = 0.0,
+        rdo_window: int = 64,
+        stats: Optional[ASTCCompressStats] = None,
+        deduplicate: bool = False,
+    ) -> bytes:
+        """
+        Compress an image.
 
-    def __init__(self, config: ASTCConfig, threads: int = 1) -> None: ...
-    def compress(self, image: ASTCImage, swizzle: ASTCSwizzle) -> bytes: ...
+        Parameters
+        ----------
+        image : ASTCImage
+            The image to compress.
+        swizzle : ASTCSwizzle
+            The swizzle applied to the image before compression.
+        rdo_lambda : float
+            Enables the rate-distortion optimization pass if > 0.
+            The pass replaces blocks by exact copies of one of the previous rdo_window blocks,
+            if that increases the mean squared error of the block by at most rdo_lambda.
+            The error is the mean over the components, weighted by the cw_*_weight of the config,
+            and measured in 8 bit units, e.g. 10 allows an RMSE increase of ~3 levels per component.
+            Values between 1 and 20 are a sensible range.
+            The result stays valid ASTC of the same size,
+            but compresses a lot better with LZ based codecs like zstd, LZ4 or deflate.
+        rdo_window : int
+            The number of previous blocks considered by the rate-distortion optimization pass.
+        stats : Optional[ASTCCompressStats]
+            If given, it's filled with statistics of the compression.
+        deduplicate : bool
+            Enables the constant color and duplicate block pre-pass.
+            Constant color blocks of LDR U8 images are written directly as void-extent blocks,
+            and identical blocks are only compressed once.
+            This speeds up sparse atlases and sprite sheets a lot,
+            but costs a bit of time for images without repeated blocks.
+            Ignored for 3D images and alpha-weight scaling with a radius.
+
+        Returns
+        -------
+        bytes
+            The compressed data.
+        """
+        ...
     def decompress(
-        self, data: bytes, image: ASTCImage, swizzle: ASTCSwizzle
-    ) -> ASTCImage: ...
+        self,
+        data: bytes,
+        image: ASTCImage,
+        swizzle: ASTCSwizzle,
+        linearize: bool = False,
+        premultiply: bool = False,
+        flip_y: bool = False,
+    ) -> ASTCImage:
+        """
+        Decompress data into an image.
+
+        The output type is the data_type of the image,
+        e.g. F16 for a half float texture upload.
+
+        The optional conversions (linearize, premultiply, flip_y) run as a second pass
+        over the decoded image, once all blocks are decoded.
+        The pass is split between the threads of the context and works in place,
+        flip_y only needs a scratch row per thread.
+
+        Parameters
+        ----------
+        data : bytes
+            The compressed data.
+        image : ASTCImage
+            The output image, its data is replaced by the decompressed data.
+        swizzle : ASTCSwizzle
+            The swizzle applied to the decompressed data.
+        linearize : bool
+            Convert the sRGB encoded RGB components to linear.
+            For U8 outputs this loses precision in the dark tones, F16/F32 outputs keep it.
+        premultiply : bool
+            Multiply the RGB components with alpha, after linearize.
+        flip_y : bool
+            Flip the image vertically, e.g. for OpenGL texture uploads.
+
+        Returns
+        -------
+        ASTCImage
+            The image.
+        """
+        ...
+
+    def compress_layers(
+        self,
+        layers: Sequence[ASTCImage],
+        swizzle: ASTCSwizzle,
+        callback: Optional[Callable[[int, bytes], Any]] = None,
+    ) -> List[bytes]:
+        """
+        Compress the layers of a texture array or cubemap.
+
+        The layers are compressed one after the other by the same worker threads,
+        instead of starting new threads for every layer.
+        For cubemaps pass the six faces in the order +X, -X, +Y, -Y, +Z, -Z.
+
+        Parameters
+        ----------
+        layers : Sequence[ASTCImage]
+            The layers.
+        swizzle : ASTCSwizzle
+            The swizzle applied to the layers before compression.
+        callback : Optional[Callable[[int, bytes], Any]]
+            Called with the index and the compressed data of each layer as soon as it is done,
+            while the workers continue with the next layer, e.g. to write it to a file.
+            An exception raised by it stops the compression and is propagated.
+
+        Returns
+        -------
+        List[bytes]
+            The compressed data of each layer.
+        """
+        ...
+
+    def compress_volume(
+        self,
+        slices: Sequence[ASTCImage],
+        swizzle: ASTCSwizzle,
+    ) -> bytes:
+        """
+        Compress a 3D image given as separate 2D slices.
+
+        The slices are used in place, so they don't have to be joined into one buffer.
+        All slices need the same size and data type.
+
+        Parameters
+        ----------
+        slices : Sequence[ASTCImage]
+            The slices, in z order.
+        swizzle : ASTCSwizzle
+            The swizzle applied to the slices before compression.
+
+        Returns
+        -------
+        bytes
+            The compressed data.
+        """
+        ...
 
 class ASTCError(Exception):
     pass
 
+def compress_multi(
+    image: ASTCImage,
+    swizzle: ASTCSwizzle,
+    configs: Sequence[Union[ASTCConfig, ASTCContext]],
+    threads: int = 0,
+) -> List[bytes]:
+    """Compress an image with multiple configurations in a single call.
+
+    All variants, e.g. different block sizes or profiles, are compressed from the same
+    input buffer by one set of worker threads,
+    instead of creating a context and running a separate compression per variant.
+
+    For configs a context is created for the call, which builds its block size tables.
+    When compressing many images, pass ASTCContext objects instead,
+    they are reused, so the tables are only built once.
+
+    Parameters
+    ----------
+    image : ASTCImage
+        The image to compress.
+    swizzle : ASTCSwizzle
+        The swizzle applied to the image before compression.
+    configs : Sequence[Union[ASTCConfig, ASTCContext]]
+        The configurations or contexts of the variants.
+        All contexts need the same thread count.
+    threads : int
+        The number of worker threads, 0 uses all cpus the process is allowed to run on.
+        If contexts are given, it has to be 0 or their thread count.
+
+    Returns
+    -------
+    List[bytes]
+        The compressed data of each variant, in the order of the configs.
+    """
+    ...
+
+def decompress(
+    data: bytes,
+    image: ASTCImage,
+    swizzle: ASTCSwizzle,
+    profile: ASTCProfile,
+    block_x: int,
+    block_y: int,
+    block_z: int = 1,
+    flags: int = 0,
+    linearize: bool = False,
+    premultiply: bool = False,
+    flip_y: bool = False,
+) -> ASTCImage:
+    """Decompress data into an image without creating an ASTCContext.
+
+    Uses single-threaded decompress-only contexts from a module-wide cache,
+    so the block size tables are only built once per block size, profile and flags.
+    This is the fast path for decoding many small textures,
+    for large textures a multi-threaded ASTCContext is faster.
+    Can be called from multiple threads at the same time.
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed data.
+    image : ASTCImage
+        The output image, its data is replaced by the decompressed data.
+    swizzle : ASTCSwizzle
+        The swizzle applied to the decompressed data.
+    profile : ASTCProfile
+        The color profile.
+    block_x : int
+        The ASTC block size X dimension.
+    block_y : int
+        The ASTC block size Y dimension.
+    block_z : int
+        The ASTC block size Z dimension.
+    flags : int
+        The ASTCConfigFlags, DECOMPRESS_ONLY is always added.
+    linearize : bool
+        See ASTCContext.decompress.
+    premultiply : bool
+        See ASTCContext.decompress.
+    flip_y : bool
+        See ASTCContext.decompress.
+
+    Returns
+    -------
+    ASTCImage
+        The image.
+    """
+    ...
+
+def clear_decode_cache() -> int:
+    """Free the cached contexts of decompress that are not in use.
+
+    Returns
+    -------
+    int
+        The number of freed contexts.
+    """
+    ...
+
 def compute_error_metrics(
     compute_hdr_metrics: bool,
     compute_hdr_rg_metrics: bool,
@@ -303,11 +684,44 @@ def compute_error_metrics(
     """
     pass
 
+def clear_context_cache() -> int:
+    """Drop the contexts cached by unpickling ASTCContexts.
+
+    Contexts that are still referenced elsewhere stay alive.
+
+    Returns
+    -------
+    int
+        The number of dropped contexts.
+    """
+    ...
+
+def get_cpu_features() -> tuple[str, ...]:
+    """Get the SIMD features supported by the host CPU.
+
+    Only the features relevant for picking the encoder implementation are checked:
+    sse2, sse4_1, popcnt, avx, avx2 and f16c on x86, neon and sve on aarch64.
+    Features are only reported if the OS supports them as well.
+    For SVE the current vector length is reported too, e.g. sve128 or sve256,
+    which decides between the sve128 and sve256 encoders.
+
+    Returns
+    -------
+    tuple[str, ...]
+        The names of the supported features.
+    """
+    ...
+
 __all__ = (
+    "ASTCCompressStats",
     "ASTCConfig",
     "ASTCContext",
     "ASTCImage",
     "ASTCSwizzle",
     "ASTCError",
+    "clear_context_cache",
+    "clear_decode_cache",
+    "compress_multi",
     "compute_error_metrics",
+    "decompress",
 )
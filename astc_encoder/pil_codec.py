@@ -10,12 +10,12 @@ from PIL import Image, ImageFile
 
 from astc_encoder import (
     ASTCConfig,
-    ASTCConfigFlags,
     ASTCContext,
     ASTCImage,
     ASTCProfile,
     ASTCSwizzle,
     ASTCType,
+    decompress,
 )
 
 
@@ -81,40 +81,35 @@ Image.register_encoder("astc", ASTCEncoder)
 
 class ASTCDecoder(ImageFile.PyDecoder):  # noqa: D101
     _pull_fd: bool = True
-    context: ASTCContext
+    profile: ASTCProfile
+    block_x: int
+    block_y: int
+    block_z: int
 
     def init(self, args: List[Any]):  # noqa: D102
         assert len(args) in (3, 4), "Invalid number of arguments"
-        profile: int = ASTCProfile(args[0])
-        block_width: int = args[1]
-        block_height: int = args[2]
-        block_depth: int = args[3] if len(args) > 3 else 1
-        assert block_depth == 1, "Cannot handle 3D textures"
-
-        config = ASTCConfig(
-            profile,
-            block_width,
-            block_height,
-            block_depth,
-            flags=ASTCConfigFlags.DECOMPRESS_ONLY,
-        )
-        self.context = ASTCContext(config)
+        self.profile = ASTCProfile(args[0])
+        self.block_x = args[1]
+        self.block_y = args[2]
+        self.block_z = args[3] if len(args) > 3 else 1
+        assert self.block_z == 1, "Cannot handle 3D textures"
+        # no context is created here,
+        # decompress takes one from the module-wide cache of decompress-only contexts
 
     def decode(
         self, buffer: Union[bytes, Image.SupportsArrayInterface]
     ) -> tuple[int, int]:  # noqa: D102
         assert self.state.xoff == 0 and self.state.yoff == 0, "Cannot handle offsets"
 
-        config = self.context.config
-        assert self.state.xsize % config.block_x == 0, (
+        assert self.state.xsize % self.block_x == 0, (
             "Invalid width, must be multiple of block width"
         )
-        assert self.state.ysize % config.block_y == 0, (
+        assert self.state.ysize % self.block_y == 0, (
             "Invalid height, must be multiple of block height"
         )
 
-        block_count_x = (self.state.xsize + config.block_x - 1) // config.block_x
-        block_count_y = (self.state.ysize + config.block_y - 1) // config.block_y
+        block_count_x = (self.state.xsize + self.block_x - 1) // self.block_x
+        block_count_y = (self.state.ysize + self.block_y - 1) // self.block_y
         expected_size = block_count_x * block_count_y * 16
 
         if len(buffer) != expected_size and self.fd is not None:
@@ -138,7 +133,15 @@ class ASTCDecoder(ImageFile.PyDecoder):  # noqa: D101
             # TODO: LA, L
             raise ValueError(f"Unsupported mode: {mode}")
 
-        self.context.decompress(buffer, astc_img, swizzle)
+        decompress(
+            buffer,
+            astc_img,
+            swizzle,
+            self.profile,
+            self.block_x,
+            self.block_y,
+            self.block_z,
+        )
 
         self.set_as_raw(astc_img.data, "RGBA")
         return -1, 0
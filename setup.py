@@ -49,6 +49,10 @@ ASTC_ENCODER_HEADERS = [
     "astcenc_vecmathlib_sve8.h",
     "astcenc_vecmathlib.h",
     "astcenc.h",
+    # image loaders used by ASTCImage.load
+    "ThirdParty/stb_image.h",
+    "ThirdParty/stb_image_write.h",
+    "ThirdParty/tinyexr.h",
 ]
 
 
@@ -134,9 +138,19 @@ class CustomBuildExt(build_ext):
             elif "sse2" in local_host.features:
                 self.extensions.append(ASTCExtension("sse2", configs["sse2"]))
         elif self.plat_name.endswith(("arm64", "aarch64")):
-            # TODO: somehow detect neon, sve128, sve256
-            # atm assume neon is always available
+            # neon is mandatory for arm64, so it's always available
             self.extensions.append(ASTCExtension("neon", configs["neon"]))
+            # sve is only supported via gcc/clang flags on linux,
+            # the vector length is checked at runtime
+            if self.plat_name.endswith("aarch64") and (
+                CIBUILDWHEEL or "sve" in local_host.features
+            ):
+                self.extensions.extend(
+                    [
+                        ASTCExtension("sve128", configs["sve128"]),
+                        ASTCExtension("sve256", configs["sve256"]),
+                    ]
+                )
         elif self.plat_name.endswith("armv7l"):
             # TODO: detect neon
             pass
@@ -222,6 +236,13 @@ class ASTCExtension(Extension):
             sources=[
                 "src/pybind.cpp",
                 "src/astcenc_error_metrics.cpp",
+                "src/context_memory.cpp",
+                "src/cpu_features.cpp",
+                "src/decode_cache.cpp",
+                "src/decode_convert.cpp",
+                "src/dedupe.cpp",
+                "src/image_load.cpp",
+                "src/rdo.cpp",
                 *[
                     f"src/astc-encoder/Source/{source}"
                     for source in ASTC_ENCODER_SOURCES
@@ -229,6 +250,13 @@ class ASTCExtension(Extension):
             ],
             depends=[
                 "src/astcenc_error_metrics.hpp",
+                "src/context_memory.hpp",
+                "src/cpu_features.hpp",
+                "src/decode_cache.hpp",
+                "src/decode_convert.hpp",
+                "src/dedupe.hpp",
+                "src/image_load.hpp",
+                "src/rdo.hpp",
                 *[
                     f"src/astc-encoder/Source/{header}"
                     for header in ASTC_ENCODER_HEADERS
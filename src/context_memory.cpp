@@ -0,0 +1,27 @@
+/**
+ * @brief Memory usage of astcenc contexts.
+ *
+ * astcenc doesn't report the size of its allocations,
+ * so they are derived from its internal structures.
+ */
+
+#include "context_memory.hpp"
+#include "astcenc_internal_entry.h"
+
+size_t get_context_memory_usage(const astcenc_context *context)
+{
+    const astcenc_contexti &ctx = context->context;
+
+    size_t size = sizeof(astcenc_context);
+    if (ctx.bsd != nullptr)
+    {
+        size += sizeof(block_size_descriptor);
+    }
+#if !defined(ASTCENC_DECOMPRESS_ONLY)
+    if (ctx.working_buffers != nullptr)
+    {
+        size += sizeof(compression_working_buffers) * ctx.thread_count;
+    }
+#endif
+    return size;
+}
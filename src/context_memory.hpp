@@ -0,0 +1,18 @@
+#ifndef CONTEXT_MEMORY_INCLUDED
+#define CONTEXT_MEMORY_INCLUDED
+#include <cstddef>
+#include "astcenc.h"
+
+/**
+ * @brief Get the memory allocated by a context.
+ *
+ * Covers the context itself, the block size descriptor tables
+ * and the per-thread compression working buffers.
+ * Allocations that only live during a compression call are not included.
+ *
+ * @param context The context.
+ *
+ * @return The size in bytes.
+ */
+size_t get_context_memory_usage(const astcenc_context *context);
+#endif
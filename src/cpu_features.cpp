@@ -0,0 +1,165 @@
+/**
+ * @brief Lightweight host cpu feature detection.
+ *
+ * Replaces archspec at import time, as it parses /proc/cpuinfo
+ * and loads a large json database, which is way too slow for just checking a few bits.
+ */
+
+#include <thread>
+
+#include "cpu_features.hpp"
+
+#if defined(__linux__)
+#include <sched.h>
+#endif
+
+#if defined(__x86_64__) || defined(_M_X64) || defined(__i386__) || defined(_M_IX86)
+#define CPU_FEATURES_X86 1
+#if defined(_MSC_VER)
+#include <intrin.h>
+#else
+#include <cpuid.h>
+#endif
+#elif defined(__aarch64__) || defined(_M_ARM64)
+#define CPU_FEATURES_ARM64 1
+#if defined(__linux__)
+#include <sys/auxv.h>
+#include <sys/prctl.h>
+#ifndef HWCAP_SVE
+#define HWCAP_SVE (1 << 22)
+#endif
+#ifndef PR_SVE_GET_VL
+#define PR_SVE_GET_VL 51
+#endif
+#ifndef PR_SVE_VL_LEN_MASK
+#define PR_SVE_VL_LEN_MASK 0xffff
+#endif
+#endif
+#endif
+
+#if defined(CPU_FEATURES_X86)
+static void cpuid(unsigned int leaf, unsigned int subleaf, unsigned int regs[4])
+{
+#if defined(_MSC_VER)
+    int info[4];
+    __cpuidex(info, (int)leaf, (int)subleaf);
+    for (int i = 0; i < 4; i++)
+    {
+        regs[i] = (unsigned int)info[i];
+    }
+#else
+    regs[0] = regs[1] = regs[2] = regs[3] = 0;
+    __cpuid_count(leaf, subleaf, regs[0], regs[1], regs[2], regs[3]);
+#endif
+}
+
+static unsigned long long xgetbv0()
+{
+#if defined(_MSC_VER)
+    return _xgetbv(0);
+#else
+    unsigned int eax, edx;
+    // xgetbv, encoded as bytes for old assemblers
+    __asm__ volatile(".byte 0x0f, 0x01, 0xd0" : "=a"(eax), "=d"(edx) : "c"(0));
+    return ((unsigned long long)edx << 32) | eax;
+#endif
+}
+
+std::vector<std::string> get_cpu_features()
+{
+    std::vector<std::string> features;
+    unsigned int regs[4];
+
+    cpuid(0, 0, regs);
+    unsigned int max_leaf = regs[0];
+    if (max_leaf < 1)
+    {
+        return features;
+    }
+
+    cpuid(1, 0, regs);
+    unsigned int ecx = regs[2];
+    unsigned int edx = regs[3];
+
+    if (edx & (1u << 26))
+    {
+        features.push_back("sse2");
+    }
+    if (ecx & (1u << 19))
+    {
+        features.push_back("sse4_1");
+    }
+    if (ecx & (1u << 23))
+    {
+        features.push_back("popcnt");
+    }
+
+    // AVX requires the OS to save the YMM registers (XCR0 bits 1 and 2)
+    bool os_avx = (ecx & (1u << 27)) && (ecx & (1u << 28)) && ((xgetbv0() & 0x6) == 0x6);
+    if (!os_avx)
+    {
+        return features;
+    }
+
+    features.push_back("avx");
+    if (ecx & (1u << 29))
+    {
+        features.push_back("f16c");
+    }
+    if (max_leaf >= 7)
+    {
+        cpuid(7, 0, regs);
+        if (regs[1] & (1u << 5))
+        {
+            features.push_back("avx2");
+        }
+    }
+
+    return features;
+}
+#elif defined(CPU_FEATURES_ARM64)
+std::vector<std::string> get_cpu_features()
+{
+    // neon (asimd) is mandatory for aarch64
+    std::vector<std::string> features = {"neon"};
+
+#if defined(__linux__)
+    if (getauxval(AT_HWCAP) & HWCAP_SVE)
+    {
+        features.push_back("sve");
+        // the sve encoders are compiled for a fixed vector length,
+        // so the current one has to be reported as well, e.g. sve256
+        int vl_bytes = prctl(PR_SVE_GET_VL);
+        if (vl_bytes > 0)
+        {
+            features.push_back("sve" + std::to_string((vl_bytes & PR_SVE_VL_LEN_MASK) * 8));
+        }
+    }
+#endif
+
+    return features;
+}
+#else
+std::vector<std::string> get_cpu_features()
+{
+    return {};
+}
+#endif
+
+unsigned int get_available_cpu_count()
+{
+#if defined(__linux__) && defined(CPU_COUNT)
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    if (sched_getaffinity(0, sizeof(set), &set) == 0)
+    {
+        int count = CPU_COUNT(&set);
+        if (count > 0)
+        {
+            return static_cast<unsigned int>(count);
+        }
+    }
+#endif
+    unsigned int count = std::thread::hardware_concurrency();
+    return count > 0 ? count : 1;
+}
@@ -0,0 +1,27 @@
+#ifndef CPU_FEATURES_INCLUDED
+#define CPU_FEATURES_INCLUDED
+#include <string>
+#include <vector>
+
+/**
+ * @brief Query the SIMD features of the host cpu that are relevant for picking an encoder.
+ *
+ * The feature names match the ones used by the linux kernel/archspec,
+ * e.g. sse2, sse4_1, popcnt, avx2, f16c, neon, sve.
+ * For SVE the current vector length is reported as well, e.g. sve256.
+ * Features are only reported if the OS also supports them (e.g. saves the AVX registers).
+ *
+ * @return The names of the supported features.
+ */
+std::vector<std::string> get_cpu_features();
+
+/**
+ * @brief Get the number of cpus the process is allowed to run on.
+ *
+ * Respects the cpu affinity mask on linux (taskset, cgroup cpusets),
+ * so that pinned worker processes don't allocate resources for every core of the host.
+ *
+ * @return The number of usable cpus.
+ */
+unsigned int get_available_cpu_count();
+#endif
@@ -0,0 +1,86 @@
+/**
+ * @brief Module-wide cache of decompress-only contexts.
+ *
+ * The block size tables of a context only depend on the block size, profile and flags,
+ * so decoding many small textures shouldn't pay for building them on every call.
+ * Each cache entry holds the idle contexts of one set of settings,
+ * a context is only used by one decoder at a time.
+ */
+
+#include "decode_cache.hpp"
+#include <map>
+#include <mutex>
+#include <tuple>
+#include <vector>
+
+typedef std::tuple<astcenc_profile, unsigned int, unsigned int, unsigned int, unsigned int> decode_key;
+
+static std::mutex decode_cache_mutex;
+static std::map<decode_key, std::vector<astcenc_context *>> decode_cache;
+
+astcenc_error acquire_decode_context(
+    astcenc_profile profile,
+    unsigned int block_x,
+    unsigned int block_y,
+    unsigned int block_z,
+    unsigned int flags,
+    astcenc_context **context)
+{
+    flags |= ASTCENC_FLG_DECOMPRESS_ONLY;
+    decode_key key(profile, block_x, block_y, block_z, flags);
+
+    {
+        std::lock_guard<std::mutex> lock(decode_cache_mutex);
+        auto entry = decode_cache.find(key);
+        if (entry != decode_cache.end() && !entry->second.empty())
+        {
+            *context = entry->second.back();
+            entry->second.pop_back();
+            return ASTCENC_SUCCESS;
+        }
+    }
+
+    // allocate outside of the lock, building the tables is the expensive part
+    astcenc_config config;
+    astcenc_error status = astcenc_config_init(profile, block_x, block_y, block_z, ASTCENC_PRE_FASTEST, flags, &config);
+    if (status != ASTCENC_SUCCESS)
+    {
+        return status;
+    }
+    return astcenc_context_alloc(&config, 1, context);
+}
+
+void release_decode_context(
+    astcenc_profile profile,
+    unsigned int block_x,
+    unsigned int block_y,
+    unsigned int block_z,
+    unsigned int flags,
+    astcenc_context *context)
+{
+    flags |= ASTCENC_FLG_DECOMPRESS_ONLY;
+    decode_key key(profile, block_x, block_y, block_z, flags);
+
+    std::lock_guard<std::mutex> lock(decode_cache_mutex);
+    decode_cache[key].push_back(context);
+}
+
+size_t clear_decode_contexts()
+{
+    std::map<decode_key, std::vector<astcenc_context *>> entries;
+    {
+        std::lock_guard<std::mutex> lock(decode_cache_mutex);
+        entries.swap(decode_cache);
+    }
+
+    size_t count = 0;
+    for (auto &entry : entries)
+    {
+        for (astcenc_context *context : entry.second)
+        {
+            astcenc_context_free(context);
+            count++;
+        }
+    }
+    return count;
+}
@@ -0,0 +1,49 @@
+#ifndef DECODE_CACHE_INCLUDED
+#define DECODE_CACHE_INCLUDED
+#include <cstddef>
+#include "astcenc.h"
+
+/**
+ * @brief Take a single-threaded decompress-only context from the module-wide cache.
+ *
+ * A new context is allocated if all cached contexts of the settings are in use.
+ * The context has to be handed back via release_decode_context.
+ * Thread-safe, so it can be called with the GIL released.
+ *
+ * @param profile The color profile.
+ * @param block_x The ASTC block size X dimension.
+ * @param block_y The ASTC block size Y dimension.
+ * @param block_z The ASTC block size Z dimension.
+ * @param flags   The config flags, ASTCENC_FLG_DECOMPRESS_ONLY is always added.
+ * @param[out] context The context.
+ *
+ * @return ASTCENC_SUCCESS on success, or an error if the context couldn't be allocated.
+ */
+astcenc_error acquire_decode_context(
+    astcenc_profile profile,
+    unsigned int block_x,
+    unsigned int block_y,
+    unsigned int block_z,
+    unsigned int flags,
+    astcenc_context **context);
+
+/**
+ * @brief Hand a context taken via acquire_decode_context back to the cache.
+ *
+ * The arguments have to match the ones used to acquire the context.
+ */
+void release_decode_context(
+    astcenc_profile profile,
+    unsigned int block_x,
+    unsigned int block_y,
+    unsigned int block_z,
+    unsigned int flags,
+    astcenc_context *context);
+
+/**
+ * @brief Free all cached contexts that are not in use.
+ *
+ * @return The number of freed contexts.
+ */
+size_t clear_decode_contexts();
+#endif
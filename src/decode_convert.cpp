@@ -0,0 +1,161 @@
+/**
+ * @brief Conversions applied to decompressed images.
+ *
+ * Done on the decode worker threads, so software renderers get upload ready data
+ * without another full pass and temporary arrays in numpy.
+ */
+
+#include <cmath>
+#include <cstring>
+#include <vector>
+
+#include "decode_convert.hpp"
+#include "astcenc_mathlib.h"
+#include "astcenc_vecmathlib.h"
+
+static float srgb_to_linear(float value)
+{
+    if (value <= 0.04045f)
+    {
+        return value / 12.92f;
+    }
+    return std::pow((value + 0.055f) / 1.055f, 2.4f);
+}
+
+static const uint8_t *srgb_to_linear_u8_table()
+{
+    static uint8_t table[256];
+    static bool initialized = []()
+    {
+        for (int i = 0; i < 256; i++)
+        {
+            table[i] = static_cast<uint8_t>(srgb_to_linear(i / 255.0f) * 255.0f + 0.5f);
+        }
+        return true;
+    }();
+    (void)initialized;
+    return table;
+}
+
+static void convert_row_u8(uint8_t *row, unsigned int width, const decode_options &options)
+{
+    const uint8_t *table = srgb_to_linear_u8_table();
+    for (unsigned int x = 0; x < width; x++)
+    {
+        uint8_t *texel = row + x * 4;
+        for (int c = 0; c < 3; c++)
+        {
+            unsigned int value = options.linearize ? table[texel[c]] : texel[c];
+            if (options.premultiply)
+            {
+                value = (value * texel[3] + 127) / 255;
+            }
+            texel[c] = static_cast<uint8_t>(value);
+        }
+    }
+}
+
+static void convert_row_f16(uint16_t *row, unsigned int width, const decode_options &options)
+{
+    for (unsigned int x = 0; x < width; x++)
+    {
+        uint16_t *texel = row + x * 4;
+        // the vecmathlib conversions are available in all SIMD variants, sf16_to_float only without F16C/NEON
+        vfloat4 color = float16_to_float(vint4(texel[0], texel[1], texel[2], texel[3]));
+        float values[4] = {color.lane<0>(), color.lane<1>(), color.lane<2>(), color.lane<3>()};
+        for (int c = 0; c < 3; c++)
+        {
+            if (options.linearize)
+            {
+                values[c] = srgb_to_linear(values[c]);
+            }
+            if (options.premultiply)
+            {
+                values[c] *= values[3];
+            }
+        }
+        vint4 half = float_to_float16(vfloat4(values[0], values[1], values[2], values[3]));
+        texel[0] = static_cast<uint16_t>(half.lane<0>());
+        texel[1] = static_cast<uint16_t>(half.lane<1>());
+        texel[2] = static_cast<uint16_t>(half.lane<2>());
+    }
+}
+
+static void convert_row_f32(float *row, unsigned int width, const decode_options &options)
+{
+    for (unsigned int x = 0; x < width; x++)
+    {
+        float *texel = row + x * 4;
+        for (int c = 0; c < 3; c++)
+        {
+            if (options.linearize)
+            {
+                texel[c] = srgb_to_linear(texel[c]);
+            }
+            if (options.premultiply)
+            {
+                texel[c] *= texel[3];
+            }
+        }
+    }
+}
+
+static void convert_row(const astcenc_image &image, uint8_t *row, const decode_options &options)
+{
+    if (!options.linearize && !options.premultiply)
+    {
+        return;
+    }
+
+    switch (image.data_type)
+    {
+    case ASTCENC_TYPE_U8:
+        convert_row_u8(row, image.dim_x, options);
+        break;
+    case ASTCENC_TYPE_F16:
+        convert_row_f16(reinterpret_cast<uint16_t *>(row), image.dim_x, options);
+        break;
+    default:
+        convert_row_f32(reinterpret_cast<float *>(row), image.dim_x, options);
+        break;
+    }
+}
+
+bool decode_options_active(const decode_options &options)
+{
+    return options.linearize || options.premultiply || options.flip_y;
+}
+
+void convert_decoded_image(const astcenc_image &image, const decode_options &options, unsigned int thread_index, unsigned int thread_count)
+{
+    size_t texel_size = image.data_type == ASTCENC_TYPE_U8 ? 4 : (image.data_type == ASTCENC_TYPE_F16 ? 8 : 16);
+    size_t row_len = image.dim_x * texel_size;
+
+    // work on pairs of rows, so that the thread converting a row also does its flip
+    size_t pairs_per_slice = (image.dim_y + 1) / 2;
+    size_t pair_count = pairs_per_slice * image.dim_z;
+    size_t first = pair_count * thread_index / thread_count;
+    size_t last = pair_count * (thread_index + 1) / thread_count;
+
+    std::vector<uint8_t> swap_row(options.flip_y ? row_len : 0);
+
+    for (size_t pair = first; pair < last; pair++)
+    {
+        uint8_t *slice = static_cast<uint8_t *>(image.data[pair / pairs_per_slice]);
+        size_t y = pair % pairs_per_slice;
+        uint8_t *top = slice + y * row_len;
+        uint8_t *bottom = slice + (image.dim_y - 1 - y) * row_len;
+
+        convert_row(image, top, options);
+        if (bottom != top)
+        {
+            convert_row(image, bottom, options);
+            if (options.flip_y)
+            {
+                std::memcpy(swap_row.data(), top, row_len);
+                std::memcpy(top, bottom, row_len);
+                std::memcpy(bottom, swap_row.data(), row_len);
+            }
+        }
+    }
+}
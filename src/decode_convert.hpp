@@ -0,0 +1,35 @@
+#ifndef DECODE_CONVERT_INCLUDED
+#define DECODE_CONVERT_INCLUDED
+#include "astcenc.h"
+
+/**
+ * @brief Conversions applied to decompressed images, to make them ready for GPU upload.
+ */
+typedef struct
+{
+    // convert the sRGB encoded RGB components to linear
+    bool linearize;
+    // multiply the RGB components with alpha, applied after linearize
+    bool premultiply;
+    // flip the image vertically, e.g. for OpenGL
+    bool flip_y;
+} decode_options;
+
+/**
+ * @brief Check if any conversion is enabled.
+ */
+bool decode_options_active(const decode_options &options);
+
+/**
+ * @brief Apply the conversions to a part of a decompressed image.
+ *
+ * The rows are split evenly between the threads,
+ * so calling this with every thread index converts the full image.
+ *
+ * @param image        The decompressed image.
+ * @param options      The conversions to apply.
+ * @param thread_index The index of the calling thread.
+ * @param thread_count The number of threads.
+ */
+void convert_decoded_image(const astcenc_image &image, const decode_options &options, unsigned int thread_index, unsigned int thread_count);
+#endif
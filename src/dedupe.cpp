@@ -0,0 +1,221 @@
+/**
+ * @brief Constant color and duplicate block detection for compression.
+ *
+ * UI atlases and sprite sheets often consist mostly of fully transparent or repeated tiles,
+ * which would otherwise all go through the full block search of astc-encoder.
+ */
+
+#include <cstring>
+
+#include "dedupe.hpp"
+
+static const uint32_t NO_BLOCK = UINT32_MAX;
+
+static size_t texel_size(astcenc_type data_type)
+{
+    return data_type == ASTCENC_TYPE_U8 ? 4 : (data_type == ASTCENC_TYPE_F16 ? 8 : 16);
+}
+
+static uint64_t hash_bytes(const uint8_t *data, size_t len)
+{
+    // FNV-1a
+    uint64_t hash = 0xcbf29ce484222325ull;
+    for (size_t i = 0; i < len; i++)
+    {
+        hash ^= data[i];
+        hash *= 0x100000001b3ull;
+    }
+    return hash;
+}
+
+static bool is_constant(const uint8_t *texels, size_t texel_count, size_t size)
+{
+    for (size_t i = 1; i < texel_count; i++)
+    {
+        if (std::memcmp(texels, texels + i * size, size) != 0)
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+static bool can_write_constant_blocks(const astcenc_config &config, const astcenc_image &image, const astcenc_swizzle &swizzle)
+{
+    if (image.data_type != ASTCENC_TYPE_U8)
+    {
+        return false;
+    }
+    if (config.profile != ASTCENC_PRF_LDR && config.profile != ASTCENC_PRF_LDR_SRGB)
+    {
+        return false;
+    }
+    if (config.flags & (ASTCENC_FLG_MAP_NORMAL | ASTCENC_FLG_MAP_RGBM))
+    {
+        return false;
+    }
+    const astcenc_swz swizzles[4] = {swizzle.r, swizzle.g, swizzle.b, swizzle.a};
+    for (astcenc_swz swz : swizzles)
+    {
+        if (swz == ASTCENC_SWZ_Z)
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+static void write_constant_block(const uint8_t *texel, const astcenc_swizzle &swizzle, uint8_t *block)
+{
+    // LDR void-extent block without extent coordinates
+    static const uint8_t header[8] = {0xFC, 0xFD, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF};
+    std::memcpy(block, header, 8);
+
+    const astcenc_swz swizzles[4] = {swizzle.r, swizzle.g, swizzle.b, swizzle.a};
+    for (int c = 0; c < 4; c++)
+    {
+        uint8_t value;
+        switch (swizzles[c])
+        {
+        case ASTCENC_SWZ_0:
+            value = 0;
+            break;
+        case ASTCENC_SWZ_1:
+            value = 255;
+            break;
+        default:
+            value = texel[swizzles[c]];
+            break;
+        }
+        // unorm8 -> unorm16
+        block[8 + c * 2] = value;
+        block[9 + c * 2] = value;
+    }
+}
+
+bool block_dedupe::is_supported(const astcenc_config &config, const astcenc_image &image)
+{
+    if (image.dim_z != 1 || config.block_z != 1)
+    {
+        return false;
+    }
+    if ((config.flags & ASTCENC_FLG_USE_ALPHA_WEIGHT) && config.a_scale_radius != 0)
+    {
+        return false;
+    }
+    return true;
+}
+
+size_t block_dedupe::prepare(
+    const astcenc_config &config,
+    const astcenc_image &image,
+    const astcenc_swizzle &swizzle,
+    uint8_t *comp_data)
+{
+    unsigned int block_count_x = (image.dim_x + config.block_x - 1) / config.block_x;
+    unsigned int block_count_y = (image.dim_y + config.block_y - 1) / config.block_y;
+    size_t block_count = (size_t)block_count_x * block_count_y;
+
+    size_t size = texel_size(image.data_type);
+    size_t row_len = config.block_x * size;
+    size_t block_len = config.block_y * row_len;
+    bool write_constants = can_write_constant_blocks(config, image, swizzle);
+
+    const uint8_t *src = static_cast<const uint8_t *>(image.data[0]);
+
+    table.clear();
+    block_map.resize(block_count);
+    // worst case, every block is unique
+    unique_texels.resize(block_count * block_len);
+    uint32_t unique_count = 0;
+
+    for (unsigned int by = 0; by < block_count_y; by++)
+    {
+        for (unsigned int bx = 0; bx < block_count_x; bx++)
+        {
+            size_t block_index = (size_t)by * block_count_x + bx;
+
+            // gather the block into the next free slot of the unique image,
+            // with the edges clamped like astc-encoder does
+            uint8_t *block = unique_texels.data() + unique_count * block_len;
+            for (unsigned int ty = 0; ty < config.block_y; ty++)
+            {
+                unsigned int y = by * config.block_y + ty;
+                if (y >= image.dim_y)
+                {
+                    y = image.dim_y - 1;
+                }
+                const uint8_t *src_row = src + (size_t)y * image.dim_x * size;
+                uint8_t *block_row = block + ty * row_len;
+
+                unsigned int x = bx * config.block_x;
+                unsigned int inside = x + config.block_x <= image.dim_x ? config.block_x : image.dim_x - x;
+                std::memcpy(block_row, src_row + x * size, inside * size);
+                for (unsigned int tx = inside; tx < config.block_x; tx++)
+                {
+                    std::memcpy(block_row + tx * size, src_row + (image.dim_x - 1) * size, size);
+                }
+            }
+
+            if (write_constants && is_constant(block, config.block_x * config.block_y, size))
+            {
+                write_constant_block(block, swizzle, comp_data + block_index * 16);
+                block_map[block_index] = NO_BLOCK;
+                continue;
+            }
+
+            uint64_t hash = hash_bytes(block, block_len);
+            uint32_t match = NO_BLOCK;
+            auto range = table.equal_range(hash);
+            for (auto it = range.first; it != range.second; ++it)
+            {
+                if (std::memcmp(unique_texels.data() + it->second * block_len, block, block_len) == 0)
+                {
+                    match = it->second;
+                    break;
+                }
+            }
+
+            if (match == NO_BLOCK)
+            {
+                match = unique_count++;
+                table.emplace(hash, match);
+            }
+            block_map[block_index] = match;
+        }
+    }
+
+    // the unique blocks are stored block after block,
+    // which is the same as an image with a width of one block
+    unique_slice = unique_texels.data();
+    unique_image.dim_x = config.block_x;
+    unique_image.dim_y = config.block_y * unique_count;
+    unique_image.dim_z = 1;
+    unique_image.data_type = image.data_type;
+    unique_image.data = &unique_slice;
+
+    unique_comp.resize(unique_count * 16);
+    return unique_count;
+}
+
+void block_dedupe::scatter(uint8_t *comp_data) const
+{
+    for (size_t i = 0; i < block_map.size(); i++)
+    {
+        if (block_map[i] != NO_BLOCK)
+        {
+            std::memcpy(comp_data + i * 16, unique_comp.data() + block_map[i] * 16, 16);
+        }
+    }
+}
+
+size_t block_dedupe::memory_usage() const
+{
+    // the hash table size is an estimate, node sizes are implementation defined
+    return sizeof(block_dedupe) +
+           unique_texels.capacity() +
+           unique_comp.capacity() +
+           block_map.capacity() * sizeof(uint32_t) +
+           table.bucket_count() * sizeof(void *) +
+           table.size() * (sizeof(std::pair<const uint64_t, uint32_t>) + 2 * sizeof(void *));
+}
@@ -0,0 +1,71 @@
+#ifndef DEDUPE_INCLUDED
+#define DEDUPE_INCLUDED
+#include <cstddef>
+#include <cstdint>
+#include <unordered_map>
+#include <vector>
+#include "astcenc.h"
+
+/**
+ * @brief Constant color and duplicate block detection for compression.
+ *
+ * The unique blocks of an image are gathered into a one block wide image,
+ * which is compressed instead of the full image, and the results are copied back
+ * to every position of the block.
+ * Constant color blocks of LDR U8 images are directly written as void-extent blocks.
+ *
+ * The buffers and the hash table are kept between calls, so that compressing
+ * many images with the same context doesn't re-allocate them.
+ */
+class block_dedupe
+{
+public:
+    /**
+     * @brief Check if an image can be deduplicated.
+     *
+     * Not supported for 3D images and alpha-weight scaling with a radius,
+     * as the latter makes a block's encoding depend on its neighbors.
+     */
+    static bool is_supported(const astcenc_config &config, const astcenc_image &image);
+
+    /**
+     * @brief Gather the unique blocks of an image and write the constant color blocks.
+     *
+     * @param config    The config of the context.
+     * @param image     The source image.
+     * @param swizzle   The swizzle used for compression.
+     * @param comp_data The output buffer of the full image, receives the constant color blocks.
+     *
+     * @return The number of unique blocks, which have to be compressed from @c unique_image.
+     */
+    size_t prepare(
+        const astcenc_config &config,
+        const astcenc_image &image,
+        const astcenc_swizzle &swizzle,
+        uint8_t *comp_data);
+
+    /**
+     * @brief Copy the compressed unique blocks to all of their positions.
+     *
+     * @param comp_data The output buffer of the full image.
+     */
+    void scatter(uint8_t *comp_data) const;
+
+    /**
+     * @brief Get the memory held by the buffers and the hash table, in bytes.
+     */
+    size_t memory_usage() const;
+
+    /** @brief The image of the unique blocks, valid after prepare. */
+    astcenc_image unique_image;
+    /** @brief The compressed data of the unique blocks, has to be filled by the caller. */
+    std::vector<uint8_t> unique_comp;
+
+private:
+    std::unordered_multimap<uint64_t, uint32_t> table;
+    std::vector<uint8_t> unique_texels;
+    void *unique_slice;
+    // the unique block of each block, or NO_BLOCK for constant color blocks
+    std::vector<uint32_t> block_map;
+};
+#endif
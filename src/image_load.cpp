@@ -0,0 +1,128 @@
+/**
+ * @brief Image file decoding via the third party loaders bundled with astc-encoder.
+ *
+ * The library configuration matches the one of astcenccli_image_external.cpp.
+ */
+
+#include <climits>
+#include <cstdlib>
+#include <cstring>
+
+#include "image_load.hpp"
+#include "astcenc_mathlib.h"
+#include "astcenc_vecmathlib.h"
+
+#define STB_IMAGE_IMPLEMENTATION
+#define STB_IMAGE_WRITE_IMPLEMENTATION
+#define STBI_MSC_SECURE_CRT
+#define STBI_NO_STDIO
+#define STBI_WRITE_NO_STDIO
+#define TINYEXR_IMPLEMENTATION
+#define TINYEXR_USE_MINIZ 0
+#define TINYEXR_USE_STB_ZLIB 1
+
+#include "ThirdParty/stb_image.h"
+#include "ThirdParty/stb_image_write.h"
+#include "ThirdParty/tinyexr.h"
+
+const char *decode_image(const uint8_t *data, size_t len, decoded_image *image)
+{
+    image->pixels = nullptr;
+    image->is_exr = false;
+
+    int dim_x = 0;
+    int dim_y = 0;
+    int components = 0;
+
+    if (IsEXRFromMemory(data, len) == TINYEXR_SUCCESS)
+    {
+        float *pixels = nullptr;
+        const char *err = nullptr;
+        if (LoadEXRFromMemory(&pixels, &dim_x, &dim_y, data, len, &err) != TINYEXR_SUCCESS)
+        {
+            // tinyexr allocates the error message, stb uses static strings
+            FreeEXRErrorMessage(err);
+            return "Failed to decode the EXR image.";
+        }
+        image->pixels = pixels;
+        image->data_type = ASTCENC_TYPE_F32;
+        image->is_exr = true;
+    }
+    else
+    {
+        if (len > INT_MAX)
+        {
+            return "Image file is too large.";
+        }
+
+        int stb_len = static_cast<int>(len);
+        if (stbi_is_hdr_from_memory(data, stb_len))
+        {
+            image->pixels = stbi_loadf_from_memory(data, stb_len, &dim_x, &dim_y, &components, 4);
+            image->data_type = ASTCENC_TYPE_F32;
+        }
+        else if (stbi_is_16_bit_from_memory(data, stb_len))
+        {
+            image->pixels = stbi_load_16_from_memory(data, stb_len, &dim_x, &dim_y, &components, 4);
+            image->data_type = ASTCENC_TYPE_F16;
+        }
+        else
+        {
+            image->pixels = stbi_load_from_memory(data, stb_len, &dim_x, &dim_y, &components, 4);
+            image->data_type = ASTCENC_TYPE_U8;
+        }
+
+        if (image->pixels == nullptr)
+        {
+            return stbi_failure_reason();
+        }
+    }
+
+    image->dim_x = static_cast<unsigned int>(dim_x);
+    image->dim_y = static_cast<unsigned int>(dim_y);
+    return nullptr;
+}
+
+void store_decoded_image(const decoded_image *image, uint8_t *out)
+{
+    size_t value_count = static_cast<size_t>(image->dim_x) * image->dim_y * 4;
+
+    if (image->data_type == ASTCENC_TYPE_F16)
+    {
+        // unorm16 -> fp16, like the astcenc cli does for 16 bit pngs
+        // the vecmathlib conversion is available in all SIMD variants, float_to_sf16 only without F16C/NEON
+        const uint16_t *src = static_cast<const uint16_t *>(image->pixels);
+        uint16_t *dst = reinterpret_cast<uint16_t *>(out);
+        for (size_t i = 0; i < value_count; i += 4)
+        {
+            vint4 half = float_to_float16(vfloat4(src[i], src[i + 1], src[i + 2], src[i + 3]) * (1.0f / 65535.0f));
+            dst[i] = static_cast<uint16_t>(half.lane<0>());
+            dst[i + 1] = static_cast<uint16_t>(half.lane<1>());
+            dst[i + 2] = static_cast<uint16_t>(half.lane<2>());
+            dst[i + 3] = static_cast<uint16_t>(half.lane<3>());
+        }
+    }
+    else
+    {
+        size_t value_size = image->data_type == ASTCENC_TYPE_U8 ? 1 : 4;
+        std::memcpy(out, image->pixels, value_count * value_size);
+    }
+}
+
+void free_decoded_image(decoded_image *image)
+{
+    if (image->pixels == nullptr)
+    {
+        return;
+    }
+
+    if (image->is_exr)
+    {
+        std::free(image->pixels);
+    }
+    else
+    {
+        stbi_image_free(image->pixels);
+    }
+    image->pixels = nullptr;
+}
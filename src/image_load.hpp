@@ -0,0 +1,49 @@
+#ifndef IMAGE_LOAD_INCLUDED
+#define IMAGE_LOAD_INCLUDED
+#include <cstddef>
+#include <cstdint>
+#include "astcenc.h"
+
+/**
+ * @brief An image decoded by one of the loaders bundled with astc-encoder.
+ *
+ * The pixels are always RGBA and owned by the loader (stb_image or tinyexr).
+ */
+typedef struct
+{
+    unsigned int dim_x;
+    unsigned int dim_y;
+    astcenc_type data_type;
+    // uint8_t for U8, uint16_t (unorm16) for F16, float for F32
+    void *pixels;
+    bool is_exr;
+} decoded_image;
+
+/**
+ * @brief Decode an image file from memory.
+ *
+ * Supports all formats of stb_image (PNG, JPEG, BMP, TGA, HDR, ...) and OpenEXR via tinyexr.
+ * 8 bit images are decoded as U8, 16 bit images as F16, HDR and EXR images as F32.
+ * Doesn't touch any python state, so it can be called with the GIL released.
+ *
+ * @param data  The encoded file data.
+ * @param len   The length of the encoded data.
+ * @param image The decoded image, has to be released via free_decoded_image.
+ *
+ * @return nullptr on success, otherwise the reason of the failure.
+ */
+const char *decode_image(const uint8_t *data, size_t len, decoded_image *image);
+
+/**
+ * @brief Store the decoded pixels in the astcenc image data layout.
+ *
+ * @param image The decoded image.
+ * @param out   The output buffer, dim_x * dim_y * 4 * size_of(data_type) bytes.
+ */
+void store_decoded_image(const decoded_image *image, uint8_t *out);
+
+/**
+ * @brief Release the pixels of a decoded image.
+ */
+void free_decoded_image(decoded_image *image);
+#endif
@@ -1,13 +1,25 @@
 #define PY_SSIZE_T_CLEAN
 #include <Python.h>
 #include "structmember.h"
+#include <chrono>
+#include <condition_variable>
+#include <functional>
 #include <future>
+#include <map>
+#include <mutex>
 #include <thread>
 #include <vector>
 #include <cctype>
 
 #include "astcenc.h"
 #include "astcenc_error_metrics.hpp"
+#include "context_memory.hpp"
+#include "cpu_features.hpp"
+#include "decode_cache.hpp"
+#include "decode_convert.hpp"
+#include "dedupe.hpp"
+#include "image_load.hpp"
+#include "rdo.hpp"
 
 PyObject *ASTCError;
 
@@ -104,18 +116,67 @@ PyObject *ASTCConfig_repr(ASTCConfigT *self)
     return PyUnicode_FromFormat("ASTCConfig<(%d, %d, %d, %d)>", self->config.profile, self->config.block_x, self->config.block_y, self->config.block_z);
 }
 
+static PyObject *members_to_dict(PyObject *self, PyMemberDef *members)
+{
+    PyObject *dict = PyDict_New();
+    if (dict == NULL)
+    {
+        return NULL;
+    }
+    for (PyMemberDef *member = members; member->name != NULL; member++)
+    {
+        PyObject *value = PyObject_GetAttrString(self, member->name);
+        if (value == NULL || PyDict_SetItemString(dict, member->name, value) < 0)
+        {
+            Py_DecRef(value);
+            Py_DecRef(dict);
+            return NULL;
+        }
+        Py_DecRef(value);
+    }
+    return dict;
+}
+
+static PyObject *ASTCConfig_reduce(ASTCConfigT *self, PyObject *Py_UNUSED(ignored))
+{
+    // recreate the config via init, so that it's validated,
+    // and then restore all (possibly user modified) fields via the slot state
+    PyObject *state = members_to_dict((PyObject *)self, ASTCConfig_members);
+    if (state == NULL)
+    {
+        return NULL;
+    }
+    PyObject *res = Py_BuildValue(
+        "O(IIIIfI)(ON)",
+        (PyObject *)Py_TYPE(self),
+        (unsigned int)self->config.profile,
+        self->config.block_x,
+        self->config.block_y,
+        self->config.block_z,
+        ASTCENC_PRE_MEDIUM,
+        self->config.flags,
+        Py_None,
+        state);
+    return res;
+}
+
+static PyMethodDef ASTCConfig_methods[] = {
+    {"__reduce__", (PyCFunction)ASTCConfig_reduce, METH_NOARGS, "Helper for pickle."},
+    {NULL, NULL, 0, NULL}};
+
 static PyType_Slot ASTCConfig_slots[] = {
     {Py_tp_dealloc, (void *)ASTCConfig_dealloc},
     {Py_tp_repr, (void *)ASTCConfig_repr},
     {Py_tp_doc, (void *)"ASTC Configuration"},
     {Py_tp_members, ASTCConfig_members},
+    {Py_tp_methods, (void *)ASTCConfig_methods},
     {Py_tp_init, (void *)ASTCConfig_init},
     {Py_tp_new, (void *)PyType_GenericNew},
     {0, NULL},
 };
 
 static PyType_Spec ASTCConfig_Spec = {
-    "astcenc.ASTCConfig",                     // const char* name;
+    "astc_encoder.ASTCConfig",                // const char* name;
     sizeof(ASTCConfigT),                      // int basicsize;
     0,                                        // int itemsize;
     Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, // unsigned int flags;
@@ -163,6 +224,24 @@ static Py_ssize_t calc_ASTCImage_data_size(ASTCImageT *image)
     return image->image.dim_x * image->image.dim_y * image->image.dim_z * factor;
 }
 
+/**
+ * @brief Get the pointers to the 2D slices of an image buffer.
+ *
+ * ASTCImage keeps all slices in one buffer, while astcenc expects a pointer per slice.
+ */
+static std::vector<void *> get_slice_pointers(const astcenc_image &image, uint8_t *data)
+{
+    size_t component_size = image.data_type == ASTCENC_TYPE_U8 ? 1 : (image.data_type == ASTCENC_TYPE_F16 ? 2 : 4);
+    size_t slice_size = (size_t)image.dim_x * image.dim_y * 4 * component_size;
+
+    std::vector<void *> slices(image.dim_z);
+    for (unsigned int z = 0; z < image.dim_z; z++)
+    {
+        slices[z] = data + z * slice_size;
+    }
+    return slices;
+}
+
 static PyMemberDef ASTCImage_members[] = {
     {"dim_x", T_UINT, offsetof(ASTCImageT, image.dim_x), READONLY, "The X dimension of the image, in texels."},
     {"dim_y", T_UINT, offsetof(ASTCImageT, image.dim_y), READONLY, "The Y dimension of the image, in texels."},
@@ -214,13 +293,27 @@ static int ASTCImage_init(ASTCImageT *self, PyObject *args, PyObject *kwargs)
 
     uint8_t data_type;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "BII|IO!", (char **)kwlist, &data_type, &self->image.dim_x, &self->image.dim_y, &self->image.dim_z, &PyBytes_Type, &self->data))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "BII|IO", (char **)kwlist, &data_type, &self->image.dim_x, &self->image.dim_y, &self->image.dim_z, &self->data))
     {
         return -1;
     }
 
     self->image.data_type = (astcenc_type)data_type;
-    Py_IncRef(self->data);
+    if (self->data == Py_None || PyBytes_Check(self->data))
+    {
+        Py_IncRef(self->data);
+    }
+    else
+    {
+        // other bytes-like objects, e.g. out-of-band pickle buffers, are copied
+        self->data = PyBytes_FromObject(self->data);
+        if (self->data == NULL)
+        {
+            self->data = Py_None;
+            Py_IncRef(self->data);
+            return -1;
+        }
+    }
 
     if (data_type != ASTCENC_TYPE_U8 && data_type != ASTCENC_TYPE_F16 && data_type != ASTCENC_TYPE_F32)
     {
@@ -248,6 +341,155 @@ static PyObject *ASTCImage_repr(ASTCImageT *self)
     return PyUnicode_FromFormat("ASTCImage(%d, %d, %d, %d)", self->image.dim_x, self->image.dim_y, self->image.dim_z, self->image.data_type);
 }
 
+static PyObject *read_image_source(PyObject *source)
+{
+    // path
+    if (PyUnicode_Check(source) || PyObject_HasAttrString(source, "__fspath__"))
+    {
+        PyObject *io = PyImport_ImportModule("io");
+        if (io == NULL)
+        {
+            return NULL;
+        }
+        PyObject *file = PyObject_CallMethod(io, "open", "Os", source, "rb");
+        Py_DecRef(io);
+        if (file == NULL)
+        {
+            return NULL;
+        }
+        PyObject *file_data = PyObject_CallMethod(file, "read", NULL);
+        if (file_data == NULL)
+        {
+            // close the file without losing the error of read
+            PyObject *type, *value, *traceback;
+            PyErr_Fetch(&type, &value, &traceback);
+            Py_DecRef(PyObject_CallMethod(file, "close", NULL));
+            Py_DecRef(file);
+            PyErr_Restore(type, value, traceback);
+            return NULL;
+        }
+        PyObject *close_res = PyObject_CallMethod(file, "close", NULL);
+        Py_DecRef(file);
+        if (close_res == NULL)
+        {
+            Py_DecRef(file_data);
+            return NULL;
+        }
+        Py_DecRef(close_res);
+        return file_data;
+    }
+    // file-like object
+    if (PyObject_HasAttrString(source, "read"))
+    {
+        return PyObject_CallMethod(source, "read", NULL);
+    }
+    // bytes-like object, bytes are returned as is
+    return PyBytes_FromObject(source);
+}
+
+static PyObject *ASTCImage_load(PyObject *cls, PyObject *args)
+{
+    PyObject *source;
+    if (!PyArg_ParseTuple(args, "O", &source))
+    {
+        return NULL;
+    }
+
+    PyObject *py_file_data = read_image_source(source);
+    if (py_file_data == NULL)
+    {
+        return NULL;
+    }
+
+    char *file_data;
+    Py_ssize_t file_len;
+    if (PyBytes_AsStringAndSize(py_file_data, &file_data, &file_len) < 0)
+    {
+        Py_DecRef(py_file_data);
+        return NULL;
+    }
+
+    // decode the file
+    decoded_image decoded;
+    const char *error;
+
+    Py_BEGIN_ALLOW_THREADS;
+    error = decode_image((const uint8_t *)file_data, (size_t)file_len, &decoded);
+    Py_END_ALLOW_THREADS;
+
+    Py_DecRef(py_file_data);
+
+    if (error != nullptr)
+    {
+        free_decoded_image(&decoded);
+        return PyErr_Format(ASTCError, "Failed to load the image: %s", error);
+    }
+
+    // move the pixels into the buffer used by the compressor
+    Py_ssize_t value_size = decoded.data_type == ASTCENC_TYPE_U8 ? 1 : (decoded.data_type == ASTCENC_TYPE_F16 ? 2 : 4);
+    PyObject *py_image_data = PyBytes_FromStringAndSize(nullptr, (Py_ssize_t)decoded.dim_x * decoded.dim_y * 4 * value_size);
+    if (py_image_data == NULL)
+    {
+        free_decoded_image(&decoded);
+        return NULL;
+    }
+    uint8_t *image_data = (uint8_t *)PyBytes_AsString(py_image_data);
+
+    Py_BEGIN_ALLOW_THREADS;
+    store_decoded_image(&decoded, image_data);
+    free_decoded_image(&decoded);
+    Py_END_ALLOW_THREADS;
+
+    PyObject *py_image = PyObject_CallFunction(cls, "BIIIO", (uint8_t)decoded.data_type, decoded.dim_x, decoded.dim_y, 1, py_image_data);
+    Py_DecRef(py_image_data);
+    return py_image;
+}
+
+static PyObject *ASTCImage_reduce_ex(ASTCImageT *self, PyObject *args)
+{
+    int protocol;
+    if (!PyArg_ParseTuple(args, "i", &protocol))
+    {
+        return NULL;
+    }
+
+    PyObject *data = self->data;
+    Py_IncRef(data);
+    if (protocol >= 5 && data != Py_None)
+    {
+        // allows the data to be passed out-of-band, without copying it into the pickle
+        PyObject *pickle = PyImport_ImportModule("pickle");
+        if (pickle == NULL)
+        {
+            Py_DecRef(data);
+            return NULL;
+        }
+        PyObject *buffer = PyObject_CallMethod(pickle, "PickleBuffer", "O", data);
+        Py_DecRef(pickle);
+        Py_DecRef(data);
+        if (buffer == NULL)
+        {
+            return NULL;
+        }
+        data = buffer;
+    }
+
+    return Py_BuildValue(
+        "O(IIIIN)",
+        (PyObject *)Py_TYPE(self),
+        (unsigned int)self->image.data_type,
+        self->image.dim_x,
+        self->image.dim_y,
+        self->image.dim_z,
+        data);
+}
+
+static PyMethodDef ASTCImage_methods[] = {
+    {"load", (PyCFunction)ASTCImage_load, METH_VARARGS | METH_CLASS,
+     "Load an image file via the image loaders of astc-encoder."},
+    {"__reduce_ex__", (PyCFunction)ASTCImage_reduce_ex, METH_VARARGS, "Helper for pickle."},
+    {NULL, NULL, 0, NULL}};
+
 PyType_Slot ASTCImage_slots[] = {
     {Py_tp_dealloc, (void *)ASTCImage_dealloc},
     {Py_tp_doc, (void *)"ASTC Image"},
@@ -256,11 +498,12 @@ PyType_Slot ASTCImage_slots[] = {
     {Py_tp_init, (void *)ASTCImage_init},
     {Py_tp_new, (void *)PyType_GenericNew},
     {Py_tp_repr, (void *)ASTCImage_repr},
+    {Py_tp_methods, (void *)ASTCImage_methods},
     {0, NULL},
 };
 
 static PyType_Spec ASTCImage_Spec = {
-    "astcenc.ASTCImage",                      // const char* name;
+    "astc_encoder.ASTCImage",                 // const char* name;
     sizeof(ASTCImageT),                       // int basicsize;
     0,                                        // int itemsize;
     Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, // unsigned int flags;
@@ -395,9 +638,21 @@ static PyObject *ASTCSwizzle_from_str(PyObject *cls, PyObject *args)
     return (PyObject *)swizzle_obj;
 }
 
+static PyObject *ASTCSwizzle_reduce(ASTCSwizzleT *self, PyObject *Py_UNUSED(ignored))
+{
+    return Py_BuildValue(
+        "O(IIII)",
+        (PyObject *)Py_TYPE(self),
+        (unsigned int)self->swizzle.r,
+        (unsigned int)self->swizzle.g,
+        (unsigned int)self->swizzle.b,
+        (unsigned int)self->swizzle.a);
+}
+
 static PyMethodDef ASTCSwizzle_methods[] = {
     {"from_str", (PyCFunction)ASTCSwizzle_from_str, METH_VARARGS | METH_CLASS,
      "Create a new ASTCSwizzle object from a string."},
+    {"__reduce__", (PyCFunction)ASTCSwizzle_reduce, METH_NOARGS, "Helper for pickle."},
     {NULL, NULL, 0, NULL}};
 
 PyType_Slot ASTCSwizzle_slots[] = {
@@ -412,13 +667,216 @@ PyType_Slot ASTCSwizzle_slots[] = {
 };
 
 static PyType_Spec ASTCSwizzle_Spec = {
-    "astcenc.ASTCSwizzle",                    // const char* name;
+    "astc_encoder.ASTCSwizzle",               // const char* name;
     sizeof(ASTCSwizzleT),                     // int basicsize;
     0,                                        // int itemsize;
     Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, // unsigned int flags;
     ASTCSwizzle_slots,                        // PyType_Slot *slots;
 };
 
+/*
+ *************************************************
+ *
+ * ASTCCompressStats
+ *
+ ************************************************
+ */
+
+PyObject *ASTCCompressStats_Object = nullptr;
+
+typedef struct ASTCCompressStats
+{
+    PyObject_HEAD
+        Py_ssize_t rdo_replaced_blocks;
+    Py_ssize_t rdo_size_before;
+    Py_ssize_t rdo_size_after;
+    Py_ssize_t block_count;
+    Py_ssize_t constant_blocks;
+    Py_ssize_t error_blocks;
+    PyObject *partition_counts;
+    PyObject *plane_counts;
+    PyObject *block_modes;
+    PyObject *endpoint_formats;
+    PyObject *thread_times;
+} ASTCCompressStatsT;
+
+static PyMemberDef ASTCCompressStats_members[] = {
+    {"block_count", T_PYSSIZET, offsetof(ASTCCompressStatsT, block_count), READONLY, "the number of blocks"},
+    {"constant_blocks", T_PYSSIZET, offsetof(ASTCCompressStatsT, constant_blocks), READONLY, "the number of constant color (void-extent) blocks"},
+    {"error_blocks", T_PYSSIZET, offsetof(ASTCCompressStatsT, error_blocks), READONLY, "the number of invalid blocks"},
+    {"partition_counts", T_OBJECT, offsetof(ASTCCompressStatsT, partition_counts), READONLY, "the number of blocks using 1, 2, 3 and 4 partitions"},
+    {"plane_counts", T_OBJECT, offsetof(ASTCCompressStatsT, plane_counts), READONLY, "the number of blocks using 1 and 2 weight planes"},
+    {"block_modes", T_OBJECT, offsetof(ASTCCompressStatsT, block_modes), READONLY, "the number of blocks per block mode"},
+    {"endpoint_formats", T_OBJECT, offsetof(ASTCCompressStatsT, endpoint_formats), READONLY, "the number of partitions per color endpoint format"},
+    {"thread_times", T_OBJECT, offsetof(ASTCCompressStatsT, thread_times), READONLY, "the wall time of each compression thread, in seconds"},
+    {"rdo_replaced_blocks", T_PYSSIZET, offsetof(ASTCCompressStatsT, rdo_replaced_blocks), READONLY, "the number of blocks replaced by the rdo pass"},
+    {"rdo_size_before", T_PYSSIZET, offsetof(ASTCCompressStatsT, rdo_size_before), READONLY, "the zlib compressed size of the data before the rdo pass, -1 if not computed"},
+    {"rdo_size_after", T_PYSSIZET, offsetof(ASTCCompressStatsT, rdo_size_after), READONLY, "the zlib compressed size of the data after the rdo pass, -1 if not computed"},
+    {NULL} /* Sentinel */
+};
+
+static void ASTCCompressStats_clear(ASTCCompressStatsT *self)
+{
+    Py_DecRef(self->partition_counts);
+    Py_DecRef(self->plane_counts);
+    Py_DecRef(self->block_modes);
+    Py_DecRef(self->endpoint_formats);
+    Py_DecRef(self->thread_times);
+    self->partition_counts = nullptr;
+    self->plane_counts = nullptr;
+    self->block_modes = nullptr;
+    self->endpoint_formats = nullptr;
+    self->thread_times = nullptr;
+}
+
+static void ASTCCompressStats_reset(ASTCCompressStatsT *self)
+{
+    ASTCCompressStats_clear(self);
+    self->rdo_replaced_blocks = 0;
+    self->rdo_size_before = -1;
+    self->rdo_size_after = -1;
+    self->block_count = 0;
+    self->constant_blocks = 0;
+    self->error_blocks = 0;
+}
+
+static PyObject *counts_to_dict(const std::map<unsigned int, Py_ssize_t> &counts)
+{
+    PyObject *dict = PyDict_New();
+    if (dict == NULL)
+    {
+        return NULL;
+    }
+    for (const auto &item : counts)
+    {
+        PyObject *key = PyLong_FromUnsignedLong(item.first);
+        PyObject *value = PyLong_FromSsize_t(item.second);
+        int res = (key == NULL || value == NULL) ? -1 : PyDict_SetItem(dict, key, value);
+        Py_DecRef(key);
+        Py_DecRef(value);
+        if (res < 0)
+        {
+            Py_DecRef(dict);
+            return NULL;
+        }
+    }
+    return dict;
+}
+
+/**
+ * @brief Fill the block statistics by inspecting the compressed blocks.
+ *
+ * Only done when stats are requested, so the compression itself isn't slowed down.
+ */
+static int ASTCCompressStats_collect(ASTCCompressStatsT *self, astcenc_context *context, const uint8_t *comp_data, size_t comp_len, const std::vector<double> &thread_times)
+{
+    Py_ssize_t partition_counts[4] = {0, 0, 0, 0};
+    Py_ssize_t plane_counts[2] = {0, 0};
+    std::map<unsigned int, Py_ssize_t> block_modes;
+    std::map<unsigned int, Py_ssize_t> endpoint_formats;
+    size_t block_count = comp_len / 16;
+    astcenc_error status = ASTCENC_SUCCESS;
+
+    Py_BEGIN_ALLOW_THREADS;
+    astcenc_block_info info;
+    for (size_t i = 0; i < block_count; i++)
+    {
+        const uint8_t *block = comp_data + i * 16;
+        status = astcenc_get_block_info(context, block, &info);
+        if (status != ASTCENC_SUCCESS)
+        {
+            break;
+        }
+        if (info.is_error_block)
+        {
+            self->error_blocks++;
+            continue;
+        }
+        if (info.is_constant_block)
+        {
+            self->constant_blocks++;
+            continue;
+        }
+        partition_counts[info.partition_count - 1]++;
+        plane_counts[info.is_dual_plane_block ? 1 : 0]++;
+        block_modes[(block[0] | (block[1] << 8)) & 0x7FF]++;
+        for (unsigned int p = 0; p < info.partition_count; p++)
+        {
+            endpoint_formats[info.color_endpoint_modes[p]]++;
+        }
+    }
+    Py_END_ALLOW_THREADS;
+
+    if (status != ASTCENC_SUCCESS)
+    {
+        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        return -1;
+    }
+
+    self->block_count = block_count;
+    self->partition_counts = Py_BuildValue("(nnnn)", partition_counts[0], partition_counts[1], partition_counts[2], partition_counts[3]);
+    self->plane_counts = Py_BuildValue("(nn)", plane_counts[0], plane_counts[1]);
+    self->block_modes = counts_to_dict(block_modes);
+    self->endpoint_formats = counts_to_dict(endpoint_formats);
+    self->thread_times = PyTuple_New(thread_times.size());
+    if (self->thread_times != NULL)
+    {
+        for (size_t i = 0; i < thread_times.size(); i++)
+        {
+            PyTuple_SetItem(self->thread_times, i, PyFloat_FromDouble(thread_times[i]));
+        }
+    }
+
+    if (self->partition_counts == NULL || self->plane_counts == NULL || self->block_modes == NULL || self->endpoint_formats == NULL || self->thread_times == NULL)
+    {
+        ASTCCompressStats_clear(self);
+        return -1;
+    }
+    return 0;
+}
+
+static int ASTCCompressStats_init(ASTCCompressStatsT *self, PyObject *args, PyObject *kwargs)
+{
+    const char *kwlist[] = {NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", (char **)kwlist))
+    {
+        return -1;
+    }
+
+    ASTCCompressStats_reset(self);
+    return 0;
+}
+
+static void ASTCCompressStats_dealloc(ASTCCompressStatsT *self)
+{
+    ASTCCompressStats_clear(self);
+    PyObject_Del(self);
+}
+
+static PyObject *ASTCCompressStats_repr(ASTCCompressStatsT *self)
+{
+    return PyUnicode_FromFormat("ASTCCompressStats<rdo: %zd blocks, %zd -> %zd bytes>", self->rdo_replaced_blocks, self->rdo_size_before, self->rdo_size_after);
+}
+
+PyType_Slot ASTCCompressStats_slots[] = {
+    {Py_tp_dealloc, (void *)ASTCCompressStats_dealloc},
+    {Py_tp_doc, (void *)"ASTC Compression Statistics"},
+    {Py_tp_members, ASTCCompressStats_members},
+    {Py_tp_init, (void *)ASTCCompressStats_init},
+    {Py_tp_new, (void *)PyType_GenericNew},
+    {Py_tp_repr, (void *)ASTCCompressStats_repr},
+    {0, NULL},
+};
+
+static PyType_Spec ASTCCompressStats_Spec = {
+    "astc_encoder.ASTCCompressStats",         // const char* name;
+    sizeof(ASTCCompressStatsT),               // int basicsize;
+    0,                                        // int itemsize;
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, // unsigned int flags;
+    ASTCCompressStats_slots,                  // PyType_Slot *slots;
+};
+
 /*
  *************************************************
  *
@@ -434,6 +892,7 @@ typedef struct ASTCContext
     PyObject_HEAD astcenc_context *context;
     ASTCConfigT *config;
     unsigned int threads;
+    block_dedupe *dedupe;
 } ASTContextT;
 
 static PyMemberDef ASTCContext_members[] = {
@@ -442,35 +901,77 @@ static PyMemberDef ASTCContext_members[] = {
     {NULL} /* Sentinel */
 };
 
+static PyObject *ASTCContext_get_memory_usage(ASTContextT *self, void *closure)
+{
+    if (self->context == nullptr)
+    {
+        return PyLong_FromLong(0);
+    }
+    size_t memory_usage = get_context_memory_usage(self->context);
+    if (self->dedupe != nullptr)
+    {
+        memory_usage += self->dedupe->memory_usage();
+    }
+    return PyLong_FromSize_t(memory_usage);
+}
+
+static PyGetSetDef ASTCContext_getseters[] = {
+    {"memory_usage", (getter)ASTCContext_get_memory_usage, NULL, "the memory allocated by the context, in bytes", NULL},
+    {NULL} /* Sentinel */
+};
+
+/**
+ * @brief Allocate the astcenc context of a lazily created context, if not done yet.
+ *
+ * @return 0 on success, -1 with an exception set if the allocation failed.
+ */
+static int ASTCContext_ensure(ASTContextT *self)
+{
+    if (self->context != nullptr)
+    {
+        return 0;
+    }
+
+    astcenc_error status = astcenc_context_alloc((const astcenc_config *)&self->config->config, self->threads, &self->context);
+    if (status != ASTCENC_SUCCESS)
+    {
+        self->context = nullptr;
+        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        return -1;
+    }
+    return 0;
+}
+
 static int ASTContext_init(ASTContextT *self, PyObject *args, PyObject *kwargs)
 {
     const char *kwlist[] = {
         "config",  // The configuration to use for encoding.
         "threads", // The number of threads to use for encoding.
+        "lazy",    // Allocate the context on first use.
         NULL};
 
     self->config = nullptr;
+    self->context = nullptr;
     self->threads = 1;
+    self->dedupe = nullptr;
+    int lazy = 0;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|I", (char **)kwlist, ASTCConfig_Object, &self->config, &self->threads))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|Ip", (char **)kwlist, ASTCConfig_Object, &self->config, &self->threads, &lazy))
     {
         return -1;
     }
 
     if (self->threads == 0)
     {
-        self->threads = std::thread::hardware_concurrency();
+        self->threads = get_available_cpu_count();
     }
 
     Py_IncRef((PyObject *)self->config);
-    astcenc_error status = astcenc_context_alloc((const astcenc_config *)&self->config->config, self->threads, &self->context);
-    if (status != ASTCENC_SUCCESS)
+    if (lazy)
     {
-        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
-        return -1;
+        return 0;
     }
-
-    return 0;
+    return ASTCContext_ensure(self);
 }
 
 static void ASTContext_dealloc(ASTContextT *self)
@@ -480,6 +981,7 @@ static void ASTContext_dealloc(ASTContextT *self)
     {
         astcenc_context_free(self->context);
     }
+    delete self->dedupe;
     PyObject_Del(self);
 }
 
@@ -488,13 +990,52 @@ static PyObject *ASTContext_repr(PyObject *self)
     return PyUnicode_FromString("ASTCContext");
 }
 
+static Py_ssize_t deflate_size(PyObject *data)
+{
+    PyObject *zlib = PyImport_ImportModule("zlib");
+    if (zlib == NULL)
+    {
+        return -1;
+    }
+    PyObject *compressed = PyObject_CallMethod(zlib, "compress", "O", data);
+    Py_DecRef(zlib);
+    if (compressed == NULL)
+    {
+        return -1;
+    }
+    Py_ssize_t size = PyBytes_Size(compressed);
+    Py_DecRef(compressed);
+    return size;
+}
+
 PyObject *ASTCContext_method_comprocess(ASTContextT *self, PyObject *args, PyObject *kwargs)
 {
-    static char *keywords[] = {(char *)"image", (char *)"swizzle", NULL};
+    static char *keywords[] = {(char *)"image", (char *)"swizzle", (char *)"rdo_lambda", (char *)"rdo_window", (char *)"stats", (char *)"deduplicate", NULL};
     ASTCImageT *py_image = nullptr;
     ASTCSwizzleT *py_swizzle = nullptr;
+    float rdo_lambda = 0.0f;
+    unsigned int rdo_window = 64;
+    PyObject *py_stats = Py_None;
+    int deduplicate = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!O!|fIOp", (char **)keywords, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle, &rdo_lambda, &rdo_window, &py_stats, &deduplicate))
+    {
+        return NULL;
+    }
+
+    ASTCCompressStatsT *stats = nullptr;
+    if (py_stats != Py_None)
+    {
+        if (!PyObject_TypeCheck(py_stats, (PyTypeObject *)ASTCCompressStats_Object))
+        {
+            PyErr_SetString(PyExc_TypeError, "stats must be an ASTCCompressStats or None.");
+            return NULL;
+        }
+        stats = (ASTCCompressStatsT *)py_stats;
+        ASTCCompressStats_reset(stats);
+    }
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!O!", (char **)keywords, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle))
+    if (ASTCContext_ensure(self) < 0)
     {
         return NULL;
     }
@@ -510,7 +1051,8 @@ PyObject *ASTCContext_method_comprocess(ASTContextT *self, PyObject *args, PyObj
         // and sets an exception
         return NULL;
     }
-    image->data = reinterpret_cast<void **>(&image_data);
+    std::vector<void *> image_slices = get_slice_pointers(*image, image_data);
+    image->data = image_slices.data();
 
     // Space needed for 16 bytes of output per compressed block
     unsigned int block_count_x = (image->dim_x + config->block_x - 1) / config->block_x;
@@ -521,23 +1063,62 @@ PyObject *ASTCContext_method_comprocess(ASTContextT *self, PyObject *args, PyObj
     PyObject *py_comp_data = PyBytes_FromStringAndSize(nullptr, comp_len);
     uint8_t *comp_data = (uint8_t *)PyBytes_AsString(py_comp_data);
 
+    // the hash table and buffers of the dedupe pre-pass are kept by the context
+    block_dedupe *dedupe = nullptr;
+    if (deduplicate && block_dedupe::is_supported(*config, *image))
+    {
+        if (self->dedupe == nullptr)
+        {
+            self->dedupe = new block_dedupe();
+        }
+        dedupe = self->dedupe;
+    }
+
     // run the compressor
     astcenc_error status;
+    std::vector<double> thread_times(self->threads);
+
+    // with dedupe, only the unique blocks are compressed
+    astcenc_image *target_image = image;
+    uint8_t *target_data = comp_data;
+    size_t target_len = comp_len;
+
+    auto compress_thread = [&](unsigned int thread_index)
+    {
+        auto start = std::chrono::steady_clock::now();
+        astcenc_error thread_status = astcenc_compress_image(
+            self->context,
+            target_image,
+            &py_swizzle->swizzle,
+            target_data,
+            target_len,
+            thread_index);
+        thread_times[thread_index] = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+        return thread_status;
+    };
 
     Py_BEGIN_ALLOW_THREADS;
-    if (self->threads > 1)
+    if (dedupe != nullptr)
+    {
+        dedupe->prepare(*config, *image, py_swizzle->swizzle, comp_data);
+        target_image = &dedupe->unique_image;
+        target_data = dedupe->unique_comp.data();
+        target_len = dedupe->unique_comp.size();
+    }
+
+    if (target_len == 0)
+    {
+        // only constant color blocks
+        status = ASTCENC_SUCCESS;
+    }
+    else if (self->threads > 1)
     {
         status = ASTCENC_SUCCESS;
 
         std::vector<std::future<astcenc_error>> futures(self->threads);
-        for (int thread_index = 0; thread_index < self->threads; thread_index++)
+        for (unsigned int thread_index = 0; thread_index < self->threads; thread_index++)
         {
-            futures[thread_index] = std::async(astcenc_compress_image, self->context,
-                                               image,
-                                               &py_swizzle->swizzle,
-                                               comp_data,
-                                               comp_len,
-                                               thread_index);
+            futures[thread_index] = std::async(compress_thread, thread_index);
         }
 
         for (auto &future : futures)
@@ -551,13 +1132,12 @@ PyObject *ASTCContext_method_comprocess(ASTContextT *self, PyObject *args, PyObj
     }
     else
     {
-        status = astcenc_compress_image(
-            self->context,
-            image,
-            &py_swizzle->swizzle,
-            comp_data,
-            comp_len,
-            0);
+        status = compress_thread(0);
+    }
+
+    if (dedupe != nullptr && status == ASTCENC_SUCCESS)
+    {
+        dedupe->scatter(comp_data);
     }
     Py_END_ALLOW_THREADS;
 
@@ -576,22 +1156,152 @@ PyObject *ASTCContext_method_comprocess(ASTContextT *self, PyObject *args, PyObj
         py_comp_data = NULL;
     }
 
+    // rate-distortion optimization post-pass
+    if (py_comp_data != NULL && rdo_lambda > 0.0f && rdo_window > 0)
+    {
+        size_t replaced = 0;
+
+        if (stats != nullptr && (stats->rdo_size_before = deflate_size(py_comp_data)) < 0)
+        {
+            Py_DecRef(py_comp_data);
+            image->data = nullptr;
+            return NULL;
+        }
+
+        Py_BEGIN_ALLOW_THREADS;
+        status = rdo_optimize(self->context, *config, *image, py_swizzle->swizzle, comp_data, comp_len, rdo_lambda, rdo_window, &replaced);
+        Py_END_ALLOW_THREADS;
+
+        if (status != ASTCENC_SUCCESS)
+        {
+            Py_DecRef(py_comp_data);
+            PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+            py_comp_data = NULL;
+        }
+        else if (stats != nullptr)
+        {
+            stats->rdo_replaced_blocks = replaced;
+            if ((stats->rdo_size_after = deflate_size(py_comp_data)) < 0)
+            {
+                Py_DecRef(py_comp_data);
+                py_comp_data = NULL;
+            }
+        }
+    }
+
+    // block statistics of the final data
+    if (py_comp_data != NULL && stats != nullptr && ASTCCompressStats_collect(stats, self->context, comp_data, comp_len, thread_times) < 0)
+    {
+        Py_DecRef(py_comp_data);
+        py_comp_data = NULL;
+    }
+
     // cleanup
     image->data = nullptr;
 
     return py_comp_data;
 }
 
+/**
+ * @brief Run the decompressor with all threads of a context and apply the output conversions.
+ *
+ * Doesn't touch any python state, so it should be called with the GIL released.
+ */
+static astcenc_error run_decompress(
+    astcenc_context *context,
+    unsigned int threads,
+    const uint8_t *comp_data,
+    size_t comp_len,
+    astcenc_image *image,
+    const astcenc_swizzle *swizzle,
+    const decode_options &options)
+{
+    astcenc_error status;
+
+    if (threads > 1)
+    {
+        status = ASTCENC_SUCCESS;
+
+        std::vector<std::future<astcenc_error>> futures(threads);
+        for (unsigned int thread_index = 0; thread_index < threads; thread_index++)
+        {
+            futures[thread_index] = std::async(astcenc_decompress_image, context,
+                                               comp_data,
+                                               comp_len,
+                                               image,
+                                               swizzle,
+                                               thread_index);
+        }
+
+        for (auto &future : futures)
+        {
+            astcenc_error future_status = future.get();
+            if (future_status != ASTCENC_SUCCESS)
+            {
+                status = future_status;
+            }
+        }
+    }
+    else
+    {
+        status = astcenc_decompress_image(
+            context,
+            comp_data,
+            comp_len,
+            image,
+            swizzle,
+            0);
+    }
+
+    astcenc_error reset_status = astcenc_decompress_reset(context);
+    if (status == ASTCENC_SUCCESS)
+    {
+        status = reset_status;
+    }
+
+    // the conversions need the fully decoded rows,
+    // so they can only start once all blocks are done
+    if (status == ASTCENC_SUCCESS && decode_options_active(options))
+    {
+        if (threads > 1)
+        {
+            std::vector<std::future<void>> futures(threads);
+            for (unsigned int thread_index = 0; thread_index < threads; thread_index++)
+            {
+                futures[thread_index] = std::async(std::launch::async, convert_decoded_image, std::cref(*image), std::cref(options), thread_index, threads);
+            }
+            for (auto &future : futures)
+            {
+                future.get();
+            }
+        }
+        else
+        {
+            convert_decoded_image(*image, options, 0, 1);
+        }
+    }
+
+    return status;
+}
+
 PyObject *ASTCContext_method_decompress(ASTContextT *self, PyObject *args, PyObject *kwargs)
 {
-    static char *keywords[] = {(char *)"data", (char *)"image", (char *)"swizzle", NULL};
+    static char *keywords[] = {(char *)"data", (char *)"image", (char *)"swizzle", (char *)"linearize", (char *)"premultiply", (char *)"flip_y", NULL};
 
     const uint8_t *comp_data;
     Py_ssize_t comp_len;
     ASTCImageT *py_image = nullptr;
     ASTCSwizzleT *py_swizzle = nullptr;
+    int linearize = 0;
+    int premultiply = 0;
+    int flip_y = 0;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y#O!O!", (char **)keywords, &comp_data, &comp_len, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y#O!O!|ppp", (char **)keywords, &comp_data, &comp_len, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle, &linearize, &premultiply, &flip_y))
+    {
+        return NULL;
+    }
+
+    if (ASTCContext_ensure(self) < 0)
     {
         return NULL;
     }
@@ -607,7 +1317,7 @@ PyObject *ASTCContext_method_decompress(ASTContextT *self, PyObject *args, PyObj
     Py_ssize_t expected_comp_len = block_count_x * block_count_y * block_count_z * 16;
     if (comp_len != expected_comp_len)
     {
-        return PyErr_Format(ASTCError, "Compressed data size does not match the image dimensions. Expected at %d, got %d.", expected_comp_len, comp_len);
+        return PyErr_Format(ASTCError, "Compressed data size does not match the image dimensions. Expected %zd, got %zd.", expected_comp_len, comp_len);
     }
 
     // prepare image
@@ -615,79 +1325,383 @@ PyObject *ASTCContext_method_decompress(ASTContextT *self, PyObject *args, PyObj
 
     PyObject *py_image_data = PyBytes_FromStringAndSize(nullptr, image_len);
     uint8_t *image_data = (uint8_t *)PyBytes_AsString(py_image_data);
-    image->data = reinterpret_cast<void **>(&image_data);
+    std::vector<void *> image_slices = get_slice_pointers(*image, image_data);
+    image->data = image_slices.data();
 
     // run the decompressor
+    decode_options options = {linearize != 0, premultiply != 0, flip_y != 0};
     astcenc_error status;
 
     Py_BEGIN_ALLOW_THREADS;
-    if (self->threads > 1)
+    status = run_decompress(self->context, self->threads, comp_data, comp_len, image, &py_swizzle->swizzle, options);
+    Py_END_ALLOW_THREADS;
+
+    // cleanup
+    image->data = nullptr;
+
+    if (status != ASTCENC_SUCCESS)
     {
-        status = ASTCENC_SUCCESS;
+        Py_DecRef(py_image_data);
+        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        return NULL;
+    }
 
-        std::vector<std::future<astcenc_error>> futures(self->threads);
-        for (int thread_index = 0; thread_index < self->threads; thread_index++)
+    // create a python bytes object from the decompressed data
+    Py_DecRef(py_image->data);
+    py_image->data = py_image_data;
+
+    // ref count gets decreased by one when the function returns
+    // so we need to increase it here to keep the object alive
+    Py_IncRef((PyObject *)py_image);
+    return (PyObject *)py_image;
+}
+
+/**
+ * @brief Compress several images with the worker threads of a context, one image after the other.
+ *
+ * Every worker runs through all images, astcenc distributes the blocks of the current image among them.
+ * The last worker to finish an image resets the context, so that the next image can start,
+ * while the calling thread hands the finished output to the callback.
+ *
+ * @param images   The images, their data has to stay valid until the function returns.
+ * @param callback A callable taking the index and the compressed data of each finished image, or Py_None.
+ *
+ * @return A list with the compressed data of each image, or NULL on error.
+ */
+static PyObject *compress_images(ASTContextT *self, std::vector<astcenc_image> &images, const astcenc_swizzle &swizzle, PyObject *callback)
+{
+    if (ASTCContext_ensure(self) < 0)
+    {
+        return NULL;
+    }
+
+    astcenc_config *config = &self->config->config;
+    size_t image_count = images.size();
+
+    // allocate all outputs upfront
+    PyObject *py_results = PyList_New(image_count);
+    if (py_results == NULL)
+    {
+        return NULL;
+    }
+    std::vector<uint8_t *> comp_datas(image_count);
+    std::vector<size_t> comp_lens(image_count);
+    for (size_t i = 0; i < image_count; i++)
+    {
+        const astcenc_image &image = images[i];
+        unsigned int block_count_x = (image.dim_x + config->block_x - 1) / config->block_x;
+        unsigned int block_count_y = (image.dim_y + config->block_y - 1) / config->block_y;
+        unsigned int block_count_z = (image.dim_z + config->block_z - 1) / config->block_z;
+        comp_lens[i] = (size_t)block_count_x * block_count_y * block_count_z * 16;
+
+        PyObject *py_comp_data = PyBytes_FromStringAndSize(nullptr, comp_lens[i]);
+        if (py_comp_data == NULL)
         {
-            futures[thread_index] = std::async(astcenc_decompress_image, self->context,
-                                               comp_data,
-                                               comp_len,
-                                               image,
-                                               &py_swizzle->swizzle,
-                                               thread_index);
+            Py_DecRef(py_results);
+            return NULL;
         }
+        comp_datas[i] = (uint8_t *)PyBytes_AsString(py_comp_data);
+        PyList_SetItem(py_results, i, py_comp_data);
+    }
 
-        for (auto &future : futures)
+    std::mutex mutex;
+    std::condition_variable condition;
+    // images that are compressed and reset
+    size_t images_done = 0;
+    // workers that finished the current image
+    unsigned int threads_done = 0;
+    // images at or after the limit aren't started, set on errors
+    size_t image_limit = image_count;
+    std::vector<astcenc_error> statuses(image_count, ASTCENC_SUCCESS);
+
+    auto compress_thread = [&](unsigned int thread_index)
+    {
+        for (size_t i = 0; i < image_count; i++)
         {
-            astcenc_error future_status = future.get();
-            if (future_status != ASTCENC_SUCCESS)
             {
-                status = future_status;
+                std::unique_lock<std::mutex> lock(mutex);
+                condition.wait(lock, [&]
+                               { return images_done == i; });
+                if (i >= image_limit)
+                {
+                    return;
+                }
+            }
+
+            astcenc_error status = astcenc_compress_image(self->context, &images[i], &swizzle, comp_datas[i], comp_lens[i], thread_index);
+
+            std::lock_guard<std::mutex> lock(mutex);
+            if (status != ASTCENC_SUCCESS)
+            {
+                statuses[i] = status;
+            }
+            if (++threads_done == self->threads)
+            {
+                threads_done = 0;
+                status = astcenc_compress_reset(self->context);
+                if (status != ASTCENC_SUCCESS)
+                {
+                    statuses[i] = status;
+                }
+                if (statuses[i] != ASTCENC_SUCCESS)
+                {
+                    image_limit = i + 1;
+                }
+                images_done++;
+                condition.notify_all();
             }
         }
+    };
+
+    bool callback_failed = false;
+
+    Py_BEGIN_ALLOW_THREADS;
+    std::vector<std::future<void>> futures(self->threads);
+    for (unsigned int thread_index = 0; thread_index < self->threads; thread_index++)
+    {
+        futures[thread_index] = std::async(std::launch::async, compress_thread, thread_index);
     }
-    else
+
+    // stream the finished images, while the workers continue with the next one
+    for (size_t i = 0; i < image_count; i++)
     {
-        status = astcenc_decompress_image(
-            self->context,
-            comp_data,
-            comp_len,
-            image,
-            &py_swizzle->swizzle,
-            0);
+        {
+            std::unique_lock<std::mutex> lock(mutex);
+            condition.wait(lock, [&]
+                           { return images_done > i || i >= image_limit; });
+            if (images_done <= i || statuses[i] != ASTCENC_SUCCESS)
+            {
+                break;
+            }
+        }
+
+        if (callback != Py_None)
+        {
+            Py_BLOCK_THREADS;
+            PyObject *ret = PyObject_CallFunction(callback, "nO", (Py_ssize_t)i, PyList_GetItem(py_results, i));
+            callback_failed = ret == NULL;
+            Py_DecRef(ret);
+            Py_UNBLOCK_THREADS;
+            if (callback_failed)
+            {
+                // the current image has to be finished for the reset, later ones are skipped
+                std::lock_guard<std::mutex> lock(mutex);
+                image_limit = images_done + 1;
+                condition.notify_all();
+                break;
+            }
+        }
+    }
+
+    for (auto &future : futures)
+    {
+        future.get();
     }
     Py_END_ALLOW_THREADS;
 
-    if (status != ASTCENC_SUCCESS)
+    if (callback_failed)
     {
-        Py_DecRef(py_image_data);
-        py_image_data = NULL;
-        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        Py_DecRef(py_results);
+        return NULL;
     }
 
-    status = astcenc_decompress_reset(self->context);
-    if (status != ASTCENC_SUCCESS)
+    for (auto status : statuses)
     {
-        Py_DecRef(py_image_data);
-        py_image_data = NULL;
-        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        if (status != ASTCENC_SUCCESS)
+        {
+            Py_DecRef(py_results);
+            PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+            return NULL;
+        }
     }
 
-    // create a python bytes object from the decompressed data
-    Py_DecRef(py_image->data);
-    py_image->data = py_image_data;
+    return py_results;
+}
 
-    // cleanup
-    image->data = nullptr;
+/**
+ * @brief Get the image of a layer or slice argument, with its data attached.
+ *
+ * The data of the image gets appended to @c data_refs with a new reference,
+ * as the ASTCImage could drop it while the GIL is released, e.g. by a callback.
+ *
+ * @param[out] image     The image, its data points to the slices.
+ * @param[out] slices    The slice pointers of the image data, have to outlive the image.
+ * @param[out] data_refs The data objects to release via Py_DecRef once the compression is done.
+ *
+ * @return false with an exception set if the argument isn't an ASTCImage with data.
+ */
+static bool get_input_image(PyObject *py_image, astcenc_image &image, std::vector<void *> &slices, std::vector<PyObject *> &data_refs)
+{
+    if (!PyObject_TypeCheck(py_image, (PyTypeObject *)ASTCImage_Object))
+    {
+        PyErr_SetString(PyExc_TypeError, "expected ASTCImage objects.");
+        return false;
+    }
+    ASTCImageT *py_astc_image = (ASTCImageT *)py_image;
+    if (!PyBytes_Check(py_astc_image->data))
+    {
+        PyErr_SetString(ASTCError, "Image has no data.");
+        return false;
+    }
+    Py_IncRef(py_astc_image->data);
+    data_refs.push_back(py_astc_image->data);
+    image = py_astc_image->image;
+    slices = get_slice_pointers(image, (uint8_t *)PyBytes_AsString(py_astc_image->data));
+    image.data = slices.data();
+    return true;
+}
 
-    // ref count gets decreased by one when the function returns
-    // so we need to increase it here to keep the object alive
-    Py_IncRef((PyObject *)py_image);
-    return (PyObject *)py_image;
+static void release_data_refs(std::vector<PyObject *> &data_refs)
+{
+    for (PyObject *data : data_refs)
+    {
+        Py_DecRef(data);
+    }
+    data_refs.clear();
+}
+
+PyObject *ASTCContext_method_compress_layers(ASTContextT *self, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {(char *)"layers", (char *)"swizzle", (char *)"callback", NULL};
+    PyObject *py_layers = nullptr;
+    ASTCSwizzleT *py_swizzle = nullptr;
+    PyObject *callback = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO!|O", (char **)keywords, &py_layers, ASTCSwizzle_Object, &py_swizzle, &callback))
+    {
+        return NULL;
+    }
+
+    if (callback != Py_None && !PyCallable_Check(callback))
+    {
+        PyErr_SetString(PyExc_TypeError, "callback must be callable or None.");
+        return NULL;
+    }
+
+    PyObject *py_layer_tuple = PySequence_Tuple(py_layers);
+    if (py_layer_tuple == NULL)
+    {
+        return NULL;
+    }
+
+    // the data of the layers is referenced separately,
+    // as the callback can replace it while the workers still read it
+    Py_ssize_t layer_count = PyTuple_Size(py_layer_tuple);
+    std::vector<astcenc_image> images(layer_count);
+    std::vector<std::vector<void *>> slices(layer_count);
+    std::vector<PyObject *> data_refs;
+    for (Py_ssize_t i = 0; i < layer_count; i++)
+    {
+        if (!get_input_image(PyTuple_GetItem(py_layer_tuple, i), images[i], slices[i], data_refs))
+        {
+            release_data_refs(data_refs);
+            Py_DecRef(py_layer_tuple);
+            return NULL;
+        }
+    }
+    Py_DecRef(py_layer_tuple);
+
+    PyObject *py_results = compress_images(self, images, py_swizzle->swizzle, callback);
+    release_data_refs(data_refs);
+    return py_results;
+}
+
+PyObject *ASTCContext_method_compress_volume(ASTContextT *self, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {(char *)"slices", (char *)"swizzle", NULL};
+    PyObject *py_slices = nullptr;
+    ASTCSwizzleT *py_swizzle = nullptr;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO!", (char **)keywords, &py_slices, ASTCSwizzle_Object, &py_swizzle))
+    {
+        return NULL;
+    }
+
+    PyObject *py_slice_tuple = PySequence_Tuple(py_slices);
+    if (py_slice_tuple == NULL)
+    {
+        return NULL;
+    }
+
+    Py_ssize_t slice_count = PyTuple_Size(py_slice_tuple);
+    if (slice_count == 0)
+    {
+        Py_DecRef(py_slice_tuple);
+        PyErr_SetString(ASTCError, "A volume needs at least one slice.");
+        return NULL;
+    }
+
+    // the volume points directly to the data of the slices,
+    // which is referenced separately, as other threads can replace it while the GIL is released
+    astcenc_image volume;
+    std::vector<void *> volume_slices;
+    std::vector<PyObject *> data_refs;
+    for (Py_ssize_t i = 0; i < slice_count; i++)
+    {
+        astcenc_image image;
+        std::vector<void *> image_slices;
+        if (!get_input_image(PyTuple_GetItem(py_slice_tuple, i), image, image_slices, data_refs))
+        {
+            release_data_refs(data_refs);
+            Py_DecRef(py_slice_tuple);
+            return NULL;
+        }
+        if (i == 0)
+        {
+            volume = image;
+        }
+        else if (image.dim_x != volume.dim_x || image.dim_y != volume.dim_y || image.data_type != volume.data_type)
+        {
+            release_data_refs(data_refs);
+            Py_DecRef(py_slice_tuple);
+            PyErr_SetString(ASTCError, "All slices must have the same size and data type.");
+            return NULL;
+        }
+        volume_slices.insert(volume_slices.end(), image_slices.begin(), image_slices.end());
+    }
+    volume.dim_z = (unsigned int)volume_slices.size();
+    volume.data = volume_slices.data();
+
+    Py_DecRef(py_slice_tuple);
+
+    std::vector<astcenc_image> images = {volume};
+    PyObject *py_results = compress_images(self, images, py_swizzle->swizzle, Py_None);
+    release_data_refs(data_refs);
+    if (py_results == NULL)
+    {
+        return NULL;
+    }
+
+    PyObject *py_comp_data = PyList_GetItem(py_results, 0);
+    Py_IncRef(py_comp_data);
+    Py_DecRef(py_results);
+    return py_comp_data;
+}
+
+static PyObject *ASTCContext_reduce(ASTContextT *self, PyObject *Py_UNUSED(ignored))
+{
+    // contexts are rebuilt from their config,
+    // and cached per process by astc_encoder.encoder._rebuild_context
+    PyObject *encoder = PyImport_ImportModule("astc_encoder.encoder");
+    if (encoder == NULL)
+    {
+        return NULL;
+    }
+    PyObject *rebuild = PyObject_GetAttrString(encoder, "_rebuild_context");
+    Py_DecRef(encoder);
+    if (rebuild == NULL)
+    {
+        return NULL;
+    }
+    return Py_BuildValue("N(OI)", rebuild, (PyObject *)self->config, self->threads);
 }
 
 static PyMethodDef ASTCContext_methods[] = {
+    {"__reduce__", (PyCFunction)ASTCContext_reduce, METH_NOARGS, "Helper for pickle."},
     {"compress", (PyCFunction)ASTCContext_method_comprocess, METH_VARARGS | METH_KEYWORDS, "compress an image."},
     {"decompress", (PyCFunction)ASTCContext_method_decompress, METH_VARARGS | METH_KEYWORDS, "decompress an image."},
+    {"compress_layers", (PyCFunction)ASTCContext_method_compress_layers, METH_VARARGS | METH_KEYWORDS, "compress the layers of a texture array or cubemap."},
+    {"compress_volume", (PyCFunction)ASTCContext_method_compress_volume, METH_VARARGS | METH_KEYWORDS, "compress a 3D image given as separate slices."},
     {NULL, NULL} /* Sentinel */
 };
 
@@ -696,6 +1710,7 @@ PyType_Slot ASTContext_slots[] = {
     {Py_tp_doc, (void *)"ASTC Context"},
     {Py_tp_repr, (void *)ASTContext_repr},
     {Py_tp_members, ASTCContext_members},
+    {Py_tp_getset, ASTCContext_getseters},
     {Py_tp_init, (void *)ASTContext_init},
     {Py_tp_new, (void *)PyType_GenericNew},
     {Py_tp_methods, ASTCContext_methods},
@@ -703,7 +1718,7 @@ PyType_Slot ASTContext_slots[] = {
 };
 
 static PyType_Spec ASTContext_Spec = {
-    "astcenc.ASTCContext",                    // const char* name;
+    "astc_encoder.ASTCContext",               // const char* name;
     sizeof(ASTContextT),                      // int basicsize;
     0,                                        // int itemsize;
     Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, // unsigned int flags;
@@ -751,11 +1766,13 @@ static PyObject *compute_error_metrics_py(PyObject *self, PyObject *args, PyObje
 
     astcenc_image *image1 = &py_img1->image;
     uint8_t *image1_data = (uint8_t *)PyBytes_AsString(py_img1->data);
-    image1->data = reinterpret_cast<void **>(&image1_data);
+    std::vector<void *> image1_slices = get_slice_pointers(*image1, image1_data);
+    image1->data = image1_slices.data();
 
     astcenc_image *image2 = &py_img2->image;
     uint8_t *image2_data = (uint8_t *)PyBytes_AsString(py_img2->data);
-    image2->data = reinterpret_cast<void **>(&image2_data);
+    std::vector<void *> image2_slices = get_slice_pointers(*image2, image2_data);
+    image2->data = image2_slices.data();
 
     astcenc_error_metrics metrics = compute_error_metrics(
         compute_hdr_metrics,
@@ -777,8 +1794,360 @@ static PyObject *compute_error_metrics_py(PyObject *self, PyObject *args, PyObje
                          "worst_angular_errorsum", metrics.worst_angular_errorsum);
 }
 
+static PyObject *compress_multi_py(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    const char *kwlist[] = {
+        "image",   // The image to compress.
+        "swizzle", // The swizzle applied to the image.
+        "configs", // The configurations or contexts to compress the image with.
+        "threads", // The number of threads to use for encoding.
+        NULL};
+
+    ASTCImageT *py_image = nullptr;
+    ASTCSwizzleT *py_swizzle = nullptr;
+    PyObject *py_configs = nullptr;
+    unsigned int threads = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!O!O|I", (char **)kwlist, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle, &py_configs, &threads))
+    {
+        return NULL;
+    }
+
+    // the tuple keeps given contexts alive while the GIL is released
+    PyObject *py_variants = PySequence_Tuple(py_configs);
+    if (py_variants == NULL)
+    {
+        return NULL;
+    }
+    Py_ssize_t variant_count = PyTuple_Size(py_variants);
+
+    // copy the configs, so that they can't change while the GIL is released,
+    // given contexts are reused, all others are allocated for this call
+    std::vector<astcenc_config> configs(variant_count);
+    std::vector<astcenc_context *> contexts(variant_count, nullptr);
+    std::vector<bool> owned(variant_count, true);
+    unsigned int context_threads = 0;
+    for (Py_ssize_t i = 0; i < variant_count; i++)
+    {
+        PyObject *py_variant = PyTuple_GetItem(py_variants, i);
+        if (PyObject_TypeCheck(py_variant, (PyTypeObject *)ASTCContext_Object))
+        {
+            ASTContextT *py_context = (ASTContextT *)py_variant;
+            if (context_threads != 0 && py_context->threads != context_threads)
+            {
+                Py_DecRef(py_variants);
+                PyErr_SetString(ASTCError, "All contexts must use the same number of threads.");
+                return NULL;
+            }
+            if (ASTCContext_ensure(py_context) < 0)
+            {
+                Py_DecRef(py_variants);
+                return NULL;
+            }
+            context_threads = py_context->threads;
+            configs[i] = py_context->config->config;
+            contexts[i] = py_context->context;
+            owned[i] = false;
+        }
+        else if (PyObject_TypeCheck(py_variant, (PyTypeObject *)ASTCConfig_Object))
+        {
+            configs[i] = ((ASTCConfigT *)py_variant)->config;
+        }
+        else
+        {
+            Py_DecRef(py_variants);
+            PyErr_SetString(PyExc_TypeError, "configs must only contain ASTCConfig or ASTCContext objects.");
+            return NULL;
+        }
+    }
+
+    // the contexts can only be used with the thread count they were created with
+    if (context_threads != 0)
+    {
+        if (threads != 0 && threads != context_threads)
+        {
+            Py_DecRef(py_variants);
+            PyErr_SetString(ASTCError, "threads must match the thread count of the given contexts.");
+            return NULL;
+        }
+        threads = context_threads;
+    }
+    else if (threads == 0)
+    {
+        threads = get_available_cpu_count();
+    }
+
+    // prepare the image once for all variants,
+    // its data is referenced, as other threads can replace it while the GIL is released
+    astcenc_image image;
+    std::vector<void *> image_slices;
+    std::vector<PyObject *> data_refs;
+    if (!get_input_image((PyObject *)py_image, image, image_slices, data_refs))
+    {
+        Py_DecRef(py_variants);
+        return NULL;
+    }
+
+    // allocate all outputs upfront
+    PyObject *py_results = PyList_New(variant_count);
+    if (py_results == NULL)
+    {
+        release_data_refs(data_refs);
+        Py_DecRef(py_variants);
+        return NULL;
+    }
+    std::vector<uint8_t *> comp_datas(variant_count);
+    std::vector<size_t> comp_lens(variant_count);
+    for (Py_ssize_t i = 0; i < variant_count; i++)
+    {
+        const astcenc_config &config = configs[i];
+        unsigned int block_count_x = (image.dim_x + config.block_x - 1) / config.block_x;
+        unsigned int block_count_y = (image.dim_y + config.block_y - 1) / config.block_y;
+        unsigned int block_count_z = (image.dim_z + config.block_z - 1) / config.block_z;
+        comp_lens[i] = (size_t)block_count_x * block_count_y * block_count_z * 16;
+
+        PyObject *py_comp_data = PyBytes_FromStringAndSize(nullptr, comp_lens[i]);
+        if (py_comp_data == NULL)
+        {
+            Py_DecRef(py_results);
+            release_data_refs(data_refs);
+            Py_DecRef(py_variants);
+            return NULL;
+        }
+        comp_datas[i] = (uint8_t *)PyBytes_AsString(py_comp_data);
+        PyList_SetItem(py_results, i, py_comp_data);
+    }
+
+    std::vector<astcenc_error> statuses(variant_count, ASTCENC_SUCCESS);
+
+    Py_BEGIN_ALLOW_THREADS;
+    // allocating a context builds its block size tables, so do it in parallel as well
+    std::vector<std::future<void>> alloc_futures;
+    for (Py_ssize_t i = 0; i < variant_count; i++)
+    {
+        if (owned[i])
+        {
+            alloc_futures.push_back(std::async(std::launch::async, [&, i]()
+                                               { statuses[i] = astcenc_context_alloc(&configs[i], threads, &contexts[i]); }));
+        }
+    }
+    for (auto &future : alloc_futures)
+    {
+        future.get();
+    }
+
+    // every worker runs through all variants, astcenc distributes the blocks among them
+    std::vector<astcenc_error> thread_statuses(variant_count * threads, ASTCENC_SUCCESS);
+    auto compress_thread = [&](unsigned int thread_index)
+    {
+        for (Py_ssize_t i = 0; i < variant_count; i++)
+        {
+            if (contexts[i] != nullptr)
+            {
+                thread_statuses[i * threads + thread_index] = astcenc_compress_image(contexts[i], &image, &py_swizzle->swizzle, comp_datas[i], comp_lens[i], thread_index);
+            }
+        }
+    };
+
+    std::vector<std::future<void>> futures(threads);
+    for (unsigned int thread_index = 0; thread_index < threads; thread_index++)
+    {
+        futures[thread_index] = std::async(std::launch::async, compress_thread, thread_index);
+    }
+    for (auto &future : futures)
+    {
+        future.get();
+    }
+
+    for (Py_ssize_t i = 0; i < variant_count; i++)
+    {
+        for (unsigned int thread_index = 0; thread_index < threads; thread_index++)
+        {
+            if (thread_statuses[i * threads + thread_index] != ASTCENC_SUCCESS)
+            {
+                statuses[i] = thread_statuses[i * threads + thread_index];
+            }
+        }
+    }
+
+    for (Py_ssize_t i = 0; i < variant_count; i++)
+    {
+        if (contexts[i] == nullptr)
+        {
+            continue;
+        }
+        if (owned[i])
+        {
+            astcenc_context_free(contexts[i]);
+        }
+        else
+        {
+            // reused contexts have to be ready for the next image
+            astcenc_error reset_status = astcenc_compress_reset(contexts[i]);
+            if (statuses[i] == ASTCENC_SUCCESS)
+            {
+                statuses[i] = reset_status;
+            }
+        }
+    }
+    Py_END_ALLOW_THREADS;
+
+    release_data_refs(data_refs);
+    Py_DecRef(py_variants);
+
+    for (auto status : statuses)
+    {
+        if (status != ASTCENC_SUCCESS)
+        {
+            Py_DecRef(py_results);
+            PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+            return NULL;
+        }
+    }
+
+    return py_results;
+}
+
+static PyObject *decompress_py(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    const char *kwlist[] = {
+        "data",        // The compressed data.
+        "image",       // The image to decompress into.
+        "swizzle",     // The swizzle applied to the decompressed image.
+        "profile",     // Color profile.
+        "block_x",     // ASTC block size X dimension.
+        "block_y",     // ASTC block size Y dimension.
+        "block_z",     // ASTC block size Z dimension.
+        "flags",       // A valid set of ASTCENC_FLG_* flag bits.
+        "linearize",   // Convert sRGB output to linear.
+        "premultiply", // Premultiply the color with the alpha.
+        "flip_y",      // Flip the output vertically.
+        NULL};
+
+    const uint8_t *comp_data;
+    Py_ssize_t comp_len;
+    ASTCImageT *py_image = nullptr;
+    ASTCSwizzleT *py_swizzle = nullptr;
+    uint8_t profile_b;
+    unsigned int block_x = 0;
+    unsigned int block_y = 0;
+    unsigned int block_z = 1;
+    unsigned int flags = 0;
+    int linearize = 0;
+    int premultiply = 0;
+    int flip_y = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y#O!O!BII|IIppp", (char **)kwlist, &comp_data, &comp_len, ASTCImage_Object, &py_image, ASTCSwizzle_Object, &py_swizzle, &profile_b, &block_x, &block_y, &block_z, &flags, &linearize, &premultiply, &flip_y))
+    {
+        return NULL;
+    }
+
+    astcenc_profile profile = (astcenc_profile)profile_b;
+    astcenc_context *context = nullptr;
+    astcenc_error status;
+
+    // the config init validates the block size
+    Py_BEGIN_ALLOW_THREADS;
+    status = acquire_decode_context(profile, block_x, block_y, block_z, flags, &context);
+    Py_END_ALLOW_THREADS;
+
+    if (status != ASTCENC_SUCCESS)
+    {
+        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        return NULL;
+    }
+
+    astcenc_image *image = &py_image->image;
+
+    // check if comp data is long enough
+    // Space needed for 16 bytes of output per compressed block
+    unsigned int block_count_x = (image->dim_x + block_x - 1) / block_x;
+    unsigned int block_count_y = (image->dim_y + block_y - 1) / block_y;
+    unsigned int block_count_z = (image->dim_z + block_z - 1) / block_z;
+    Py_ssize_t expected_comp_len = block_count_x * block_count_y * block_count_z * 16;
+    if (comp_len != expected_comp_len)
+    {
+        release_decode_context(profile, block_x, block_y, block_z, flags, context);
+        return PyErr_Format(ASTCError, "Compressed data size does not match the image dimensions. Expected %zd, got %zd.", expected_comp_len, comp_len);
+    }
+
+    // prepare image
+    Py_ssize_t image_len = calc_ASTCImage_data_size(py_image);
+
+    PyObject *py_image_data = PyBytes_FromStringAndSize(nullptr, image_len);
+    if (py_image_data == NULL)
+    {
+        release_decode_context(profile, block_x, block_y, block_z, flags, context);
+        return NULL;
+    }
+    uint8_t *image_data = (uint8_t *)PyBytes_AsString(py_image_data);
+    std::vector<void *> image_slices = get_slice_pointers(*image, image_data);
+    image->data = image_slices.data();
+
+    // run the decompressor
+    decode_options options = {linearize != 0, premultiply != 0, flip_y != 0};
+
+    Py_BEGIN_ALLOW_THREADS;
+    status = run_decompress(context, 1, comp_data, comp_len, image, &py_swizzle->swizzle, options);
+    release_decode_context(profile, block_x, block_y, block_z, flags, context);
+    Py_END_ALLOW_THREADS;
+
+    // cleanup
+    image->data = nullptr;
+
+    if (status != ASTCENC_SUCCESS)
+    {
+        Py_DecRef(py_image_data);
+        PyErr_SetString(ASTCError, astcenc_get_error_string(status));
+        return NULL;
+    }
+
+    Py_DecRef(py_image->data);
+    py_image->data = py_image_data;
+
+    Py_IncRef((PyObject *)py_image);
+    return (PyObject *)py_image;
+}
+
+static PyObject *clear_decode_cache_py(PyObject *self, PyObject *args)
+{
+    size_t count;
+
+    Py_BEGIN_ALLOW_THREADS;
+    count = clear_decode_contexts();
+    Py_END_ALLOW_THREADS;
+
+    return PyLong_FromSize_t(count);
+}
+
+static PyObject *get_cpu_features_py(PyObject *self, PyObject *args)
+{
+    std::vector<std::string> features = get_cpu_features();
+
+    PyObject *py_features = PyTuple_New(features.size());
+    if (py_features == NULL)
+    {
+        return NULL;
+    }
+    for (size_t i = 0; i < features.size(); i++)
+    {
+        PyObject *py_feature = PyUnicode_FromString(features[i].c_str());
+        if (py_feature == NULL)
+        {
+            Py_DecRef(py_features);
+            return NULL;
+        }
+        PyTuple_SetItem(py_features, i, py_feature);
+    }
+    return py_features;
+}
+
 static PyMethodDef astc_encoder_functions[] = {
     {"compute_error_metrics", (PyCFunction)compute_error_metrics_py, METH_VARARGS | METH_KEYWORDS, "compute error metrics"},
+    {"compress_multi", (PyCFunction)compress_multi_py, METH_VARARGS | METH_KEYWORDS, "compress an image with multiple configurations"},
+    {"decompress", (PyCFunction)decompress_py, METH_VARARGS | METH_KEYWORDS, "decompress an image with a cached decompress-only context"},
+    {"clear_decode_cache", (PyCFunction)clear_decode_cache_py, METH_NOARGS, "free the cached decompress-only contexts"},
+    {"get_cpu_features", (PyCFunction)get_cpu_features_py, METH_NOARGS, "get the simd features supported by the host cpu"},
     {NULL, NULL, 0, NULL} /* Sentinel */
 };
 
@@ -839,6 +2208,12 @@ PyMODINIT_FUNC INIT_FUNC_NAME(void)
         return NULL;
     }
 
+    ASTCCompressStats_Object = PyType_FromSpec(&ASTCCompressStats_Spec);
+    if (add_object(m, "ASTCCompressStats", ASTCCompressStats_Object) < 0)
+    {
+        return NULL;
+    }
+
     ASTCError = PyErr_NewException("astc_encoder.ASTCError", nullptr, nullptr);
     if (add_object(m, "ASTCError", ASTCError) < 0)
     {
@@ -0,0 +1,208 @@
+/**
+ * @brief Rate-distortion optimization of compressed ASTC data.
+ *
+ * astc-encoder picks the best encoding per block without any knowledge of
+ * the compression applied afterwards, so the output barely compresses with LZ based codecs.
+ * This post-pass trades a bit of quality for exact block repeats within a sliding window,
+ * which LZ codecs can store as cheap back-references.
+ */
+
+#include <cstring>
+#include <vector>
+
+#include "rdo.hpp"
+#include "astcenc_mathlib.h"
+#include "astcenc_vecmathlib.h"
+
+static float load_component(const astcenc_image &image, unsigned int x, unsigned int y, unsigned int z, unsigned int component)
+{
+    size_t index = ((size_t)y * image.dim_x + x) * 4 + component;
+    switch (image.data_type)
+    {
+    case ASTCENC_TYPE_U8:
+        return static_cast<const uint8_t *>(image.data[z])[index] / 255.0f;
+    case ASTCENC_TYPE_F16:
+        // sf16_to_float only exists in builds without F16C/NEON
+        return float16_to_float(vint4(static_cast<const uint16_t *>(image.data[z])[index])).lane<0>();
+    default:
+        return static_cast<const float *>(image.data[z])[index];
+    }
+}
+
+static float load_swizzled_component(const astcenc_image &image, unsigned int x, unsigned int y, unsigned int z, astcenc_swz swz)
+{
+    switch (swz)
+    {
+    case ASTCENC_SWZ_R:
+    case ASTCENC_SWZ_G:
+    case ASTCENC_SWZ_B:
+    case ASTCENC_SWZ_A:
+        return load_component(image, x, y, z, static_cast<unsigned int>(swz));
+    case ASTCENC_SWZ_1:
+        return 1.0f;
+    default:
+        // 0, Z isn't allowed for compression
+        return 0.0f;
+    }
+}
+
+astcenc_error rdo_optimize(
+    astcenc_context *context,
+    const astcenc_config &config,
+    const astcenc_image &image,
+    const astcenc_swizzle &swizzle,
+    uint8_t *comp_data,
+    size_t comp_len,
+    float lambda,
+    unsigned int window,
+    size_t *replaced)
+{
+    *replaced = 0;
+
+    unsigned int block_count_x = (image.dim_x + config.block_x - 1) / config.block_x;
+    unsigned int block_count_y = (image.dim_y + config.block_y - 1) / config.block_y;
+    unsigned int block_count_z = (image.dim_z + config.block_z - 1) / config.block_z;
+    size_t block_count = (size_t)block_count_x * block_count_y * block_count_z;
+
+    // decode the data into a block aligned image,
+    // so that every block has a full set of decoded texels
+    unsigned int padded_x = block_count_x * config.block_x;
+    unsigned int padded_y = block_count_y * config.block_y;
+    unsigned int padded_z = block_count_z * config.block_z;
+    size_t slice_len = (size_t)padded_x * padded_y * 4;
+
+    std::vector<float> decoded(slice_len * padded_z);
+    std::vector<void *> decoded_slices(padded_z);
+    for (unsigned int z = 0; z < padded_z; z++)
+    {
+        decoded_slices[z] = decoded.data() + z * slice_len;
+    }
+    astcenc_image decoded_image = {padded_x, padded_y, padded_z, ASTCENC_TYPE_F32, decoded_slices.data()};
+    astcenc_swizzle identity = {ASTCENC_SWZ_R, ASTCENC_SWZ_G, ASTCENC_SWZ_B, ASTCENC_SWZ_A};
+
+    astcenc_error status = astcenc_decompress_image(context, comp_data, comp_len, &decoded_image, &identity, 0);
+    astcenc_decompress_reset(context);
+    if (status != ASTCENC_SUCCESS)
+    {
+        return status;
+    }
+
+    // normalized, so that the error of a texel is the weighted mean over its components
+    float weight_sum = config.cw_r_weight + config.cw_g_weight + config.cw_b_weight + config.cw_a_weight;
+    float weight_scale = weight_sum > 0.0f ? 255.0f * 255.0f / weight_sum : 0.0f;
+    const float weights[4] = {
+        config.cw_r_weight * weight_scale,
+        config.cw_g_weight * weight_scale,
+        config.cw_b_weight * weight_scale,
+        config.cw_a_weight * weight_scale,
+    };
+    const astcenc_swz swizzles[4] = {swizzle.r, swizzle.g, swizzle.b, swizzle.a};
+
+    // the block whose decoded texels are currently stored at the position of a block
+    std::vector<size_t> sources(block_count);
+    for (size_t i = 0; i < block_count; i++)
+    {
+        sources[i] = i;
+    }
+
+    // texels of the current block that are within the image,
+    // as offset within a block of the decoded image and reference color
+    std::vector<size_t> texel_offsets;
+    std::vector<float> texel_colors;
+    texel_offsets.reserve(config.block_x * config.block_y * config.block_z);
+    texel_colors.reserve(config.block_x * config.block_y * config.block_z * 4);
+
+    auto block_origin = [&](size_t block) -> size_t
+    {
+        size_t bx = block % block_count_x;
+        size_t by = (block / block_count_x) % block_count_y;
+        size_t bz = block / ((size_t)block_count_x * block_count_y);
+        return bz * config.block_z * slice_len + (by * config.block_y * padded_x + bx * config.block_x) * 4;
+    };
+
+    auto block_error = [&](size_t block, float limit) -> float
+    {
+        const float *texels = decoded.data() + block_origin(block);
+        float error = 0.0f;
+        for (size_t t = 0; t < texel_offsets.size(); t++)
+        {
+            const float *texel = texels + texel_offsets[t];
+            const float *reference = texel_colors.data() + t * 4;
+            for (int c = 0; c < 4; c++)
+            {
+                float diff = texel[c] - reference[c];
+                error += weights[c] * diff * diff;
+            }
+            if (error > limit)
+            {
+                break;
+            }
+        }
+        return error;
+    };
+
+    for (size_t i = 1; i < block_count; i++)
+    {
+        uint8_t *block_data = comp_data + i * 16;
+
+        // gather the reference texels
+        size_t bx = i % block_count_x;
+        size_t by = (i / block_count_x) % block_count_y;
+        size_t bz = i / ((size_t)block_count_x * block_count_y);
+
+        texel_offsets.clear();
+        texel_colors.clear();
+        for (unsigned int tz = 0; tz < config.block_z; tz++)
+        {
+            unsigned int z = bz * config.block_z + tz;
+            for (unsigned int ty = 0; ty < config.block_y; ty++)
+            {
+                unsigned int y = by * config.block_y + ty;
+                for (unsigned int tx = 0; tx < config.block_x; tx++)
+                {
+                    unsigned int x = bx * config.block_x + tx;
+                    if (x >= image.dim_x || y >= image.dim_y || z >= image.dim_z)
+                    {
+                        continue;
+                    }
+                    texel_offsets.push_back(tz * slice_len + ((size_t)ty * padded_x + tx) * 4);
+                    for (int c = 0; c < 4; c++)
+                    {
+                        texel_colors.push_back(load_swizzled_component(image, x, y, z, swizzles[c]));
+                    }
+                }
+            }
+        }
+
+        float best_error = block_error(sources[i], 1e30f) + lambda * texel_offsets.size();
+        size_t best = i;
+
+        size_t first = i > window ? i - window : 0;
+        for (size_t j = i; j-- > first;)
+        {
+            const uint8_t *candidate_data = comp_data + j * 16;
+            if (std::memcmp(candidate_data, block_data, 16) == 0)
+            {
+                // already a repeat
+                best = i;
+                break;
+            }
+
+            float error = block_error(sources[j], best_error);
+            if (error <= best_error && (best == i || error < best_error))
+            {
+                best_error = error;
+                best = j;
+            }
+        }
+
+        if (best != i)
+        {
+            std::memcpy(block_data, comp_data + best * 16, 16);
+            sources[i] = sources[best];
+            (*replaced)++;
+        }
+    }
+
+    return ASTCENC_SUCCESS;
+}
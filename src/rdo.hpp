@@ -0,0 +1,41 @@
+#ifndef RDO_INCLUDED
+#define RDO_INCLUDED
+#include <cstddef>
+#include <cstdint>
+#include "astcenc.h"
+
+/**
+ * @brief Rate-distortion optimize compressed ASTC data for downstream LZ compression.
+ *
+ * Each block is replaced by an exact copy of one of the previous @c window blocks,
+ * if that increases its mean squared error by at most @c lambda.
+ * Repeated 16 byte sequences compress well with zstd/LZ4/deflate,
+ * while the data stays valid ASTC of the same size.
+ *
+ * The error is measured per texel as the weighted (cw_*_weight) mean of the squared
+ * component errors, in 8 bit units (1.0 == 255).
+ * So a lambda of 10 allows an increase of the per component RMSE of up to ~3 levels.
+ *
+ * @param context   The context used to compress the data, used for decoding it again.
+ * @param config    The config of the context.
+ * @param image     The source image.
+ * @param swizzle   The swizzle used for compression.
+ * @param comp_data The compressed data, modified in place.
+ * @param comp_len  The length of the compressed data.
+ * @param lambda    The allowed error increase per texel for replacing a block.
+ * @param window    The number of previous blocks to consider.
+ * @param replaced  The number of replaced blocks.
+ *
+ * @return ASTCENC_SUCCESS on success, or an error if decoding the data failed.
+ */
+astcenc_error rdo_optimize(
+    astcenc_context *context,
+    const astcenc_config &config,
+    const astcenc_image &image,
+    const astcenc_swizzle &swizzle,
+    uint8_t *comp_data,
+    size_t comp_len,
+    float lambda,
+    unsigned int window,
+    size_t *replaced);
+#endif
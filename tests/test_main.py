@@ -1,10 +1,15 @@
 import gc
+import importlib
 import os
+import pickle
+import random
+import struct
 import sys
 from typing import Tuple
 
 import imagehash
 import psutil
+import pytest
 from PIL import Image
 
 import astc_encoder
@@ -67,6 +72,422 @@ def test_4x4():
     _run_test_config(IMG_RGBA, astc_encoder.ASTCSwizzle(), (4, 4))
 
 
+def test_arm_variants_match_neon():
+    """Test that the sve encoders produce the same output as the neon encoder"""
+    features = astc_encoder.encoder.get_cpu_features()
+    variants = [
+        importlib.import_module(f"astc_encoder._encoder_{name}")
+        for name in ("sve128", "sve256")
+        if name in features
+    ]
+    if "neon" not in features or not variants:
+        pytest.skip("no sve encoder available on this host")
+
+    neon = importlib.import_module("astc_encoder._encoder_neon")
+
+    def compress(module):
+        image = module.ASTCImage(
+            astc_encoder.ASTCType.U8,
+            IMG_RGBA.width,
+            IMG_RGBA.height,
+            data=IMG_RGBA.tobytes("raw", "RGBA"),
+        )
+        config = module.ASTCConfig(astc_encoder.ASTCProfile.LDR, 6, 6)
+        context = module.ASTCContext(config)
+        return context.compress(image, module.ASTCSwizzle())
+
+    expected = compress(neon)
+    for variant in variants:
+        assert compress(variant) == expected, f"{variant.__name__} differs from neon"
+
+
+def test_variant_fallback(monkeypatch: pytest.MonkeyPatch):
+    """Test that variants which fail to import fall back to the next supported one"""
+    encoder = astc_encoder.encoder
+    supported = [
+        name
+        for name, required in encoder._VARIANTS
+        if required <= encoder.local_features
+    ]
+    try:
+        # block the preferred variant, then all
+        for name in supported:
+            monkeypatch.setitem(sys.modules, f"astc_encoder.{name}", None)
+            importlib.reload(encoder)
+            index = supported.index(name) + 1
+            for expected_name in supported[index:] + ["_encoder_none"]:
+                try:
+                    expected = importlib.import_module(f"astc_encoder.{expected_name}")
+                except ImportError:
+                    continue
+                break
+            assert encoder._variant is expected
+    finally:
+        monkeypatch.undo()
+        importlib.reload(encoder)
+
+
+def test_image_load():
+    """Test ASTCImage.load from a path, bytes and a file-like object"""
+    path = os.path.join(TEST_DIR, "RGBA.png")
+    expected = IMG_RGBA.convert("RGBA").tobytes("raw", "RGBA")
+
+    with open(path, "rb") as f:
+        sources = [path, f.read()]
+    with open(path, "rb") as f:
+        sources.append(f)
+        for source in sources:
+            image = astc_encoder.ASTCImage.load(source)
+            assert image.data_type == astc_encoder.ASTCType.U8
+            assert (image.dim_x, image.dim_y, image.dim_z) == (*IMG_RGBA.size, 1)
+            assert image.data == expected
+
+    try:
+        astc_encoder.ASTCImage.load(b"not an image")
+        raise AssertionError("Expected ASTCError")
+    except astc_encoder.ASTCError:
+        pass
+
+
+def test_rdo():
+    """Test that the rdo pass makes the data more compressible without breaking it"""
+    # a noisy gradient, neighbouring blocks are similar, but never identical
+    rng = random.Random(0)
+    width = height = 128
+    data = bytes(
+        value
+        for y in range(height)
+        for x in range(width)
+        for value in (
+            (x + y) // 4 + rng.randint(0, 3),
+            64 + y // 2 + rng.randint(0, 3),
+            128 + rng.randint(0, 3),
+            255,
+        )
+    )
+    image = astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, width, height, data=data)
+    swizzle = astc_encoder.ASTCSwizzle()
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4)
+    context = astc_encoder.ASTCContext(config)
+
+    stats = astc_encoder.ASTCCompressStats()
+    comp = context.compress(image, swizzle, stats=stats)
+    assert stats.rdo_replaced_blocks == 0
+    assert stats.rdo_size_before == stats.rdo_size_after == -1
+
+    lambda_ = 10.0
+    comp_rdo = context.compress(image, swizzle, rdo_lambda=lambda_, stats=stats)
+    assert len(comp_rdo) == len(comp)
+    assert stats.rdo_replaced_blocks > 0
+    assert stats.rdo_size_after < stats.rdo_size_before
+
+    def mse(comp_data: bytes) -> float:
+        decomp = context.decompress(
+            comp_data,
+            astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, width, height),
+            swizzle,
+        )
+        return sum((a - b) ** 2 for a, b in zip(data, decomp.data)) / len(data)
+
+    # the error increase per block is bound by lambda, +1 for the rounding to 8 bit
+    assert mse(comp_rdo) <= mse(comp) + lambda_ + 1
+
+
+def test_compress_stats():
+    """Test the block statistics of ASTCCompressStats"""
+    image = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8,
+        IMG_RGBA.width,
+        IMG_RGBA.height,
+        data=IMG_RGBA.tobytes("raw", "RGBA"),
+    )
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4)
+    context = astc_encoder.ASTCContext(config, threads=2)
+
+    stats = astc_encoder.ASTCCompressStats()
+    comp = context.compress(image, astc_encoder.ASTCSwizzle(), stats=stats)
+
+    assert stats.block_count == len(comp) // 16
+    assert stats.error_blocks == 0
+    encoded_blocks = stats.block_count - stats.constant_blocks
+    assert sum(stats.partition_counts) == encoded_blocks
+    assert sum(stats.plane_counts) == encoded_blocks
+    assert sum(stats.block_modes.values()) == encoded_blocks
+    assert sum(stats.endpoint_formats.values()) == sum(
+        count * (i + 1) for i, count in enumerate(stats.partition_counts)
+    )
+    assert len(stats.thread_times) == 2
+    assert all(t >= 0 for t in stats.thread_times)
+
+
+def test_deduplicate():
+    """Test that the dedupe pre-pass doesn't change the decompressed result"""
+    # repeated tiles in the top half, transparent bottom half, uneven size for edge blocks
+    tile = IMG_RGBA.crop((0, 0, 16, 16))
+    img = Image.new("RGBA", (70, 66), (0, 0, 0, 0))
+    for x in range(0, 64, 16):
+        for y in range(0, 32, 16):
+            img.paste(tile, (x, y))
+
+    image = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8, img.width, img.height, data=img.tobytes()
+    )
+    swizzle = astc_encoder.ASTCSwizzle()
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4)
+    context = astc_encoder.ASTCContext(config, threads=2)
+
+    def decompress(comp: bytes) -> bytes:
+        image_dec = astc_encoder.ASTCImage(
+            astc_encoder.ASTCType.U8, img.width, img.height
+        )
+        return context.decompress(comp, image_dec, swizzle).data
+
+    expected = decompress(context.compress(image, swizzle))
+    for _ in range(2):
+        # twice to check that the reused table is reset
+        comp = context.compress(image, swizzle, deduplicate=True)
+        assert decompress(comp) == expected
+
+
+def test_compress_multi():
+    """Test that compress_multi matches separate compress calls"""
+    image = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8,
+        IMG_RGBA.width,
+        IMG_RGBA.height,
+        data=IMG_RGBA.tobytes("raw", "RGBA"),
+    )
+    swizzle = astc_encoder.ASTCSwizzle()
+    configs = [
+        astc_encoder.ASTCConfig(profile, *block_size)
+        for profile in (astc_encoder.ASTCProfile.LDR, astc_encoder.ASTCProfile.LDR_SRGB)
+        for block_size in ((4, 4), (6, 6), (8, 8))
+    ]
+
+    results = astc_encoder.compress_multi(image, swizzle, configs, threads=2)
+    assert len(results) == len(configs)
+    for config, comp in zip(configs, results):
+        context = astc_encoder.ASTCContext(config)
+        assert comp == context.compress(image, swizzle)
+
+    # reused contexts, two calls in a row
+    contexts = [astc_encoder.ASTCContext(config, threads=2) for config in configs]
+    assert astc_encoder.compress_multi(image, swizzle, contexts) == results
+    assert astc_encoder.compress_multi(image, swizzle, contexts, threads=2) == results
+    # the contexts stay usable on their own
+    assert contexts[0].compress(image, swizzle) == results[0]
+
+    with pytest.raises(astc_encoder.ASTCError):
+        astc_encoder.compress_multi(image, swizzle, contexts, threads=3)
+
+
+def test_decompress_conversions():
+    """Test the output conversions of decompress"""
+    width, height = IMG_RGBA.size
+    image = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8, width, height, data=IMG_RGBA.tobytes()
+    )
+    swizzle = astc_encoder.ASTCSwizzle()
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR_SRGB, 4, 4)
+    context = astc_encoder.ASTCContext(config, threads=2)
+    comp = context.compress(image, swizzle)
+
+    def decompress(data_type: astc_encoder.ASTCType, **kwargs) -> bytes:
+        image_dec = astc_encoder.ASTCImage(data_type, width, height)
+        return context.decompress(comp, image_dec, swizzle, **kwargs).data
+
+    # flip_y + premultiply
+    plain = decompress(astc_encoder.ASTCType.U8)
+    row_len = width * 4
+    flipped = b"".join(
+        plain[y * row_len : (y + 1) * row_len] for y in reversed(range(height))
+    )
+    expected = bytearray(flipped)
+    for i in range(0, len(expected), 4):
+        alpha = expected[i + 3]
+        for c in range(3):
+            expected[i + c] = (expected[i + c] * alpha + 127) // 255
+    assert decompress(astc_encoder.ASTCType.U8, premultiply=True, flip_y=True) == expected
+
+    # linearize
+    plain = struct.unpack(f"{width * height * 4}f", decompress(astc_encoder.ASTCType.F32))
+    linear = struct.unpack(
+        f"{width * height * 4}f",
+        decompress(astc_encoder.ASTCType.F32, linearize=True),
+    )
+    for i, (value, value_linear) in enumerate(zip(plain, linear)):
+        if i % 4 == 3:
+            assert value_linear == value
+        elif value <= 0.04045:
+            assert abs(value_linear - value / 12.92) < 1e-5
+        else:
+            assert abs(value_linear - ((value + 0.055) / 1.055) ** 2.4) < 1e-5
+
+
+def test_decompress_cached():
+    """Test that the module-level decompress matches ASTCContext.decompress"""
+    width, height = IMG_RGBA.size
+    image = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8, width, height, data=IMG_RGBA.tobytes()
+    )
+    swizzle = astc_encoder.ASTCSwizzle()
+    astc_encoder.clear_decode_cache()
+    for block_size in ((4, 4), (6, 6), (4, 4)):
+        config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, *block_size)
+        context = astc_encoder.ASTCContext(config)
+        comp = context.compress(image, swizzle)
+        expected = context.decompress(
+            comp, astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, width, height), swizzle
+        ).data
+        image_dec = astc_encoder.decompress(
+            comp,
+            astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, width, height),
+            swizzle,
+            astc_encoder.ASTCProfile.LDR,
+            *block_size,
+        )
+        assert image_dec.data == expected
+    # one context per block size
+    assert astc_encoder.clear_decode_cache() == 2
+
+    with pytest.raises(astc_encoder.ASTCError):
+        astc_encoder.decompress(
+            comp[:-16],
+            astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, width, height),
+            swizzle,
+            astc_encoder.ASTCProfile.LDR,
+            4,
+            4,
+        )
+
+
+def test_compress_layers():
+    """Test that compress_layers matches separate compress calls"""
+    swizzle = astc_encoder.ASTCSwizzle()
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4)
+    context = astc_encoder.ASTCContext(config, threads=2)
+    faces = [
+        astc_encoder.ASTCImage(
+            astc_encoder.ASTCType.U8,
+            32,
+            32,
+            data=IMG_RGBA.crop((x, 0, x + 32, 32)).tobytes(),
+        )
+        for x in range(0, 6 * 32, 32)
+    ]
+
+    streamed = []
+    results = context.compress_layers(
+        faces, swizzle, callback=lambda i, comp: streamed.append((i, comp))
+    )
+    assert len(results) == len(faces)
+    assert streamed == list(enumerate(results))
+    for face, comp in zip(faces, results):
+        assert comp == context.compress(face, swizzle)
+
+    # the error of the callback is propagated, the context stays usable
+    def callback(i: int, comp: bytes):
+        raise KeyError(i)
+
+    with pytest.raises(KeyError):
+        context.compress_layers(faces, swizzle, callback=callback)
+    assert context.compress_layers(faces, swizzle) == results
+
+    # dropping the data in the callback doesn't affect the running compression
+    def drop_data(i: int, comp: bytes):
+        for face in faces:
+            face.data = None
+        gc.collect()
+
+    assert context.compress_layers(faces, swizzle, callback=drop_data) == results
+
+
+def test_compress_volume():
+    """Test that compress_volume matches compressing the joined slices"""
+    swizzle = astc_encoder.ASTCSwizzle()
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4, 4)
+    context = astc_encoder.ASTCContext(config, threads=2)
+    slice_datas = [
+        IMG_RGBA.crop((0, y, 32, y + 32)).tobytes() for y in range(0, 8 * 32, 32)
+    ]
+    slices = [
+        astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, 32, 32, data=slice_data)
+        for slice_data in slice_datas
+    ]
+    volume = astc_encoder.ASTCImage(
+        astc_encoder.ASTCType.U8, 32, 32, len(slices), data=b"".join(slice_datas)
+    )
+    assert context.compress_volume(slices, swizzle) == context.compress(volume, swizzle)
+
+    with pytest.raises(astc_encoder.ASTCError):
+        small_slice = astc_encoder.ASTCImage(
+            astc_encoder.ASTCType.U8, 16, 16, data=bytes(16 * 16 * 4)
+        )
+        context.compress_volume([slices[0], small_slice], swizzle)
+
+
+def test_context_memory_usage():
+    """Test ASTCContext.memory_usage"""
+    config = astc_encoder.ASTCConfig(astc_encoder.ASTCProfile.LDR, 4, 4)
+    usage_1 = astc_encoder.ASTCContext(config, threads=1).memory_usage
+    usage_4 = astc_encoder.ASTCContext(config, threads=4).memory_usage
+    assert 0 < usage_1 < usage_4
+
+
+def test_pickle():
+    """Test pickling of configs, swizzles, images and contexts"""
+    config = astc_encoder.ASTCConfig(
+        astc_encoder.ASTCProfile.LDR_SRGB,
+        6,
+        6,
+        quality=astc_encoder.ASTCQualityPreset.THOROUGH,
+        flags=astc_encoder.ASTCConfigFlags.USE_PERCEPTUAL,
+    )
+    config.tune_db_limit = 42.5
+    config.cw_g_weight = 2.0
+    config_re = pickle.loads(pickle.dumps(config))
+    for name in dir(config):
+        if not name.startswith("_") and not callable(getattr(config, name)):
+            assert getattr(config_re, name) == getattr(config, name), name
+
+    swizzle = astc_encoder.ASTCSwizzle.from_str("bgr1")
+    swizzle_re = pickle.loads(pickle.dumps(swizzle))
+    assert (swizzle_re.r, swizzle_re.g, swizzle_re.b, swizzle_re.a) == (
+        swizzle.r,
+        swizzle.g,
+        swizzle.b,
+        swizzle.a,
+    )
+
+    data = IMG_RGBA.tobytes()
+    image = astc_encoder.ASTCImage(astc_encoder.ASTCType.U8, *IMG_RGBA.size, data=data)
+    for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+        image_re = pickle.loads(pickle.dumps(image, protocol=protocol))
+        assert (image_re.dim_x, image_re.dim_y, image_re.dim_z) == IMG_RGBA.size + (1,)
+        assert image_re.data_type == image.data_type
+        assert image_re.data == data
+    # out-of-band
+    buffers = []
+    dump = pickle.dumps(image, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1 and len(dump) < len(data)
+    assert pickle.loads(dump, buffers=buffers).data == data
+
+    context = astc_encoder.ASTCContext(config, threads=2)
+    dump = pickle.dumps(context)
+    context_re = pickle.loads(dump)
+    assert context_re.threads == 2
+    assert context_re.config.tune_db_limit == config.tune_db_limit
+    # cached per process
+    assert pickle.loads(dump) is context_re
+    # created lazily
+    assert context_re.memory_usage == 0
+    context_re.compress(image, astc_encoder.ASTCSwizzle())
+    assert context_re.memory_usage > 0
+
+    assert astc_encoder.clear_context_cache() >= 1
+    assert pickle.loads(dump) is not context_re
+
+
 def test_invalid_block_sizes():
     """Test invalid block sizes, expect ASTCError"""
     for block_size in [(3, 3), (7, 7), (13, 13), (2, 2, 2), (7, 7, 7)]: